@@ -1,22 +1,40 @@
-from fastapi import FastAPI, HTTPException, Depends, Query
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Depends, Request
+from pydantic import AfterValidator, BaseModel
 import modal
 from codegen import Codebase
 from langchain_core.messages import SystemMessage
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
 import uvicorn
-from typing import List, Dict, Any, Optional
-from fastapi.responses import StreamingResponse
-import json
+from typing import Annotated, List, Dict, Any, Optional, Tuple
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+import orjson
+import numpy as np
+import hashlib
+import hmac
 import httpx
 import asyncio
+import time
+import uuid
+import weakref
 from datetime import datetime, timedelta
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from contextvars import ContextVar
+
+import store
 
 # Import agentgen components
 from agentgen.agents.code_agent import CodeAgent
 from agentgen.extensions.tools.semantic_search import semantic_search
-from agentgen.extensions.tools.view_file import view_file
 from agentgen.extensions.tools.reveal_symbol import reveal_symbol
 from agentgen.extensions.langchain.agent import create_agent_with_tools
 from agentgen.extensions.langchain.tools import (
@@ -27,6 +45,11 @@ from agentgen.extensions.langchain.tools import (
     ViewFileTool,
 )
 
+try:
+    from agentgen.extensions.index.file_index import FileIndex
+except ImportError:  # agentgen builds without a standalone index
+    FileIndex = None
+
 # Modal configuration for cloud deployment
 image = (
     modal.Image.debian_slim()
@@ -34,11 +57,12 @@ image = (
     .pip_install(
         "codegen==0.22.1",
         "fastapi",
-        "uvicorn",
+        "uvicorn[standard]",
         "langchain",
         "langchain-core",
         "pydantic",
-        "httpx",
+        "httpx[http2]",
+        "orjson",
     )
 )
 
@@ -49,16 +73,39 @@ app = modal.App(
 )
 
 # Create FastAPI app
-fastapi_app = FastAPI()
+fastapi_app = FastAPI(default_response_class=ORJSONResponse)
+
+# Comma-separated list of origins allowed to call this API from a browser
+CORS_ORIGINS = os.environ.get("CORS_ORIGINS", "http://localhost:3000").split(",")
 
 fastapi_app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "DELETE"],
+    allow_headers=["Content-Type", "Accept", "Authorization"],
+    max_age=86400,
 )
 
+
+class JSONGZipMiddleware(GZipMiddleware):
+    """
+    Gzip responses except server-sent event streams, whose frames would be
+    held back in the compressor instead of reaching the client as they come.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and (
+            scope["path"].endswith("/stream")
+            or b"text/event-stream" in dict(scope["headers"]).get(b"accept", b"")
+        ):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+fastapi_app.add_middleware(JSONGZipMiddleware, minimum_size=1024)
+
 # Research agent prompt
 RESEARCH_AGENT_PROMPT = """You are a code research expert. Your goal is to help users understand codebases by:
 1. Finding relevant code through semantic and text search
@@ -75,24 +122,99 @@ When analyzing code, consider:
 
 Break down complex concepts into understandable pieces and use examples when helpful."""
 
-current_status = "Intializing process..."
+# Maximum number of queries from one /research/batch request run at once
+RESEARCH_BATCH_CONCURRENCY = int(os.environ.get("RESEARCH_BATCH_CONCURRENCY", "5"))
+
+# Threads that run blocking parsing, search and analysis work off the event loop
+BLOCKING_POOL_SIZE = int(os.environ.get("BLOCKING_POOL_SIZE", str(2 * (os.cpu_count() or 1))))
+blocking_pool = ThreadPoolExecutor(max_workers=BLOCKING_POOL_SIZE, thread_name_prefix="codehub-blocking")
+
+
+async def run_blocking(func, *args):
+    """Run a blocking function in the blocking pool and await its result."""
+    return await asyncio.get_running_loop().run_in_executor(blocking_pool, func, *args)
+
+
+# Work currently running for some caller, keyed by what it computes
+_inflight: Dict[tuple, asyncio.Task] = {}
+
+
+async def singleflight(key: tuple, func):
+    """
+    Run func() unless a call with the same key is already running, in which
+    case wait for and share that call's result instead. The call runs in its
+    own task, so a caller that is cancelled (e.g. a client disconnecting)
+    stops waiting without cancelling it for the others.
+    """
+    task = _inflight.get(key)
+    if task is None:
+        task = _inflight[key] = asyncio.create_task(func())
+
+        def done(task: asyncio.Task):
+            if _inflight.get(key) is task:
+                del _inflight[key]
+            # Nobody may be left waiting, so mark a failure as seen
+            if not task.cancelled():
+                task.exception()
+
+        task.add_done_callback(done)
+    return await asyncio.shield(task)
+
+
+# Per-request queue that streaming endpoints drain into status frames
+status_queue: ContextVar[Optional[asyncio.Queue]] = ContextVar("status_queue", default=None)
 
 
 def update_status(new_status: str):
-    global current_status
-    current_status = new_status
-    return {"type": "status", "content": new_status}
+    status = {"type": "status", "content": new_status}
+    queue = status_queue.get()
+    if queue is not None:
+        queue.put_nowait(status)
+    return status
+
+
+def drain_statuses(queue: asyncio.Queue) -> List[Dict[str, Any]]:
+    """Pop every status update queued so far."""
+    statuses = []
+    while not queue.empty():
+        statuses.append(queue.get_nowait())
+    return statuses
+
+
+def normalize_repo_name(repo_name: str) -> str:
+    """
+    Case-fold an owner/repo name. GitHub names are case-insensitive, so this
+    makes user input and webhook payloads agree on every cache key.
+    """
+    return repo_name.strip().casefold()
+
+
+RepoName = Annotated[str, AfterValidator(normalize_repo_name)]
 
 
 class ResearchRequest(BaseModel):
-    repo_name: str
+    repo_name: RepoName
     query: str
+    no_cache: bool = False
 
 
 class ResearchResponse(BaseModel):
     response: str
 
 
+class BatchResearchRequest(BaseModel):
+    repo_name: RepoName
+    queries: List[str]
+
+
+class BatchResearchResponse(BaseModel):
+    responses: List[str]
+
+
+class InvalidateRequest(BaseModel):
+    repo_name: RepoName
+
+
 class FilesResponse(BaseModel):
     files: List[str]
 
@@ -106,7 +228,7 @@ class CodebaseStatsResponse(BaseModel):
 
 
 class SymbolRequest(BaseModel):
-    repo_name: str
+    repo_name: RepoName
     symbol_name: str
     filepath: Optional[str] = None
 
@@ -178,61 +300,501 @@ class CreateCategoryRequest(BaseModel):
     color: Optional[str] = None
 
 
-# In-memory storage for MVP phase
-# In a production environment, this would be replaced with a database
-saved_repositories: Dict[int, SavedRepository] = {}
-categories: Dict[str, Category] = {}
+# Local checkouts of GitHub repos, reused across requests and processes
+CODEBASE_CACHE_DIR = os.environ.get(
+    "CODEBASE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "codehub-repos")
+)
 
 
-@fastapi_app.post("/research", response_model=ResearchResponse)
-async def research(request: ResearchRequest) -> ResearchResponse:
+# Checkouts of commits other than the one a repo was cloned at. Each load
+# gets a directory of its own, removed once its Codebase is garbage collected
+CODEBASE_CHECKOUT_DIR = os.path.join(CODEBASE_CACHE_DIR, ".checkouts")
+
+
+def git(repo_dir: str, *args: str) -> str:
+    """Run a git command in a repository and return its output."""
+    return subprocess.run(
+        ["git", "-C", repo_dir, *args],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+
+
+def checkout_repo(repo_name: str, loaded_commit: Optional[str] = None) -> Optional[Tuple[str, str]]:
     """
-    Endpoint to perform code research on a GitHub repository.
+    Get a local checkout of the latest commit of a GitHub repository, as
+    (directory, commit), or None if that commit is loaded_commit already.
+    A new repository is a shallow, blobless clone; an existing one only
+    fetches. A checkout is never updated in place, since an older Codebase
+    may still be parsing or reading it: a new commit is checked out into a
+    fresh worktree instead.
+    """
+    if not re.fullmatch(r"[\w.-]+/[\w.-]+", repo_name) or ".." in repo_name:
+        raise ValueError(f"Invalid repository name: {repo_name}")
+
+    repo_dir = os.path.join(CODEBASE_CACHE_DIR, repo_name)
+    if os.path.isdir(os.path.join(repo_dir, ".git")):
+        try:
+            git(repo_dir, "fetch", "--depth=1", "--prune", "origin")
+            commit = git(repo_dir, "rev-parse", "FETCH_HEAD")
+        except subprocess.CalledProcessError as e:
+            # Fall back to the commit we already have
+            print(f"Error updating checkout of {repo_name}: {e.stderr}")
+            if loaded_commit is not None:
+                return None
+            commit = git(repo_dir, "rev-parse", "HEAD")
+
+        if commit == loaded_commit:
+            return None
+        if commit == git(repo_dir, "rev-parse", "HEAD"):
+            return repo_dir, commit
+
+        checkout_parent = os.path.join(CODEBASE_CHECKOUT_DIR, repo_name)
+        os.makedirs(checkout_parent, exist_ok=True)
+        checkout_dir = tempfile.mkdtemp(prefix=f"{commit[:12]}-", dir=checkout_parent)
+        try:
+            # Forget worktrees whose directories were already removed
+            git(repo_dir, "worktree", "prune")
+            git(repo_dir, "worktree", "add", "--detach", checkout_dir, commit)
+        except subprocess.CalledProcessError:
+            shutil.rmtree(checkout_dir, ignore_errors=True)
+            raise
+        return checkout_dir, commit
+
+    # Clone next to the final location and move it into place, so concurrent
+    # workers never parse a half-written checkout
+    os.makedirs(os.path.dirname(repo_dir), exist_ok=True)
+    clone_dir = tempfile.mkdtemp(dir=os.path.dirname(repo_dir))
+    try:
+        subprocess.run(
+            [
+                "git", "clone", "--depth=1", "--filter=blob:none",
+                f"https://github.com/{repo_name}.git", clone_dir,
+            ],
+            check=True,
+            capture_output=True,
+        )
+        os.rename(clone_dir, repo_dir)
+    except OSError:
+        # Another worker finished its clone first
+        if not os.path.isdir(os.path.join(repo_dir, ".git")):
+            raise
+    finally:
+        shutil.rmtree(clone_dir, ignore_errors=True)
+    return repo_dir, git(repo_dir, "rev-parse", "HEAD")
+
+
+# Parsed codebases are kept for CODEBASE_CACHE_TTL seconds, and at most
+# CODEBASE_CACHE_SIZE of them, least recently used evicted first
+CODEBASE_CACHE_SIZE = int(os.environ.get("CODEBASE_CACHE_SIZE", "16"))
+CODEBASE_CACHE_TTL = float(os.environ.get("CODEBASE_CACHE_TTL", "900"))
+
+
+class CachedCodebase:
     """
+    A parsed repository and what is derived from it. The file index lives
+    here so that it is evicted and invalidated together with the codebase.
+    """
+
+    def __init__(self, repo_name: str, commit: str, codebase: Codebase):
+        self.repo_name = repo_name
+        self.commit = commit
+        self.codebase = codebase
+        self.loaded_at = time.monotonic()
+        self.file_index: Optional["QuantizedFileIndex"] = None
+        # Held while the file index is built, so concurrent batches build it once
+        self.file_index_lock = threading.Lock()
+
+
+_codebase_cache: "OrderedDict[str, CachedCodebase]" = OrderedDict()
+_codebase_locks: Dict[str, asyncio.Lock] = {}
+
+
+def load_codebase(repo_name: str, loaded: Optional[CachedCodebase] = None) -> CachedCodebase:
+    """
+    Check out and parse a repository. Returns the loaded entry as it is if
+    the repository has not moved on since it was parsed.
+    """
+    checkout = checkout_repo(repo_name, loaded.commit if loaded is not None else None)
+    if checkout is None:
+        return loaded
+
+    repo_dir, commit = checkout
+    if os.path.dirname(repo_dir) != os.path.join(CODEBASE_CHECKOUT_DIR, repo_name):
+        return CachedCodebase(repo_name, commit, Codebase(repo_dir))
+
     try:
-        update_status("Initializing codebase...")
-        codebase = Codebase.from_repo(request.repo_name)
-
-        update_status("Creating research tools...")
-        tools = [
-            ViewFileTool(codebase),
-            ListDirectoryTool(codebase),
-            SearchTool(codebase),
-            SemanticSearchTool(codebase),
-            RevealSymbolTool(codebase),
+        codebase = Codebase(repo_dir)
+    except Exception:
+        shutil.rmtree(repo_dir, ignore_errors=True)
+        raise
+    weakref.finalize(codebase, shutil.rmtree, repo_dir, ignore_errors=True)
+    return CachedCodebase(repo_name, commit, codebase)
+
+
+async def get_cached_codebase(repo_name: str) -> CachedCodebase:
+    """
+    Get the cache entry for a repository, cloning and parsing it on first
+    use or once the cached copy has expired. Concurrent misses for the same
+    repo wait on a single clone.
+    """
+    lock = _codebase_locks.setdefault(repo_name, asyncio.Lock())
+    async with lock:
+        cached = _codebase_cache.get(repo_name)
+        if cached is not None and time.monotonic() - cached.loaded_at < CODEBASE_CACHE_TTL:
+            _codebase_cache.move_to_end(repo_name)
+            return cached
+
+        # A repository with nothing new upstream keeps its parsed codebase
+        cached = await run_blocking(load_codebase, repo_name, cached)
+        cached.loaded_at = time.monotonic()
+        response_cache.track_commit(repo_name, cached.commit)
+        _codebase_cache[repo_name] = cached
+        _codebase_cache.move_to_end(repo_name)
+        while len(_codebase_cache) > CODEBASE_CACHE_SIZE:
+            _codebase_cache.popitem(last=False)
+        return cached
+
+
+async def get_codebase(repo_name: str) -> Codebase:
+    """Get the parsed codebase for a repository."""
+    return (await get_cached_codebase(repo_name)).codebase
+
+
+# File embeddings are stored per commit, outside the checkouts themselves
+SEMANTIC_INDEX_DIR = os.path.join(CODEBASE_CACHE_DIR, ".indexes")
+
+
+# Files kept after the sign-bit pass for full-precision scoring
+COARSE_SEARCH_CANDIDATES = 1000
+
+
+class QuantizedFileIndex:
+    """
+    Two-stage search over a file index. The Hamming distance between sign
+    bits of the embeddings picks candidates, then cosine similarity on the
+    full vectors ranks only those candidates.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        vectors = np.asarray(index.E, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.vectors = vectors / np.maximum(norms, 1e-12)
+        self.bits = np.packbits(self.vectors > 0, axis=1)
+        self.filepaths = [str(getattr(item, "filepath", item)) for item in index.items]
+
+    def search_many(self, queries: List[str], k: int) -> List[List[Tuple[str, float]]]:
+        """Search for several queries, embedding them in a single call."""
+        query_vectors = np.asarray(self.index._get_embeddings(queries), dtype=np.float32)
+        query_vectors /= np.maximum(np.linalg.norm(query_vectors, axis=1, keepdims=True), 1e-12)
+        return [self._rank(query_vector, k) for query_vector in query_vectors]
+
+    def _rank(self, query_vector: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        if len(self.filepaths) > COARSE_SEARCH_CANDIDATES:
+            query_bits = np.packbits(query_vector > 0)
+            distances = np.unpackbits(self.bits ^ query_bits, axis=1).sum(axis=1)
+            candidates = np.argpartition(distances, COARSE_SEARCH_CANDIDATES)[:COARSE_SEARCH_CANDIDATES]
+        else:
+            candidates = np.arange(len(self.filepaths))
+
+        scores = self.vectors[candidates] @ query_vector
+        top = np.argsort(-scores)[:k]
+        return [(self.filepaths[candidates[i]], float(scores[i])) for i in top]
+
+
+def get_file_index(cached: CachedCodebase) -> QuantizedFileIndex:
+    """
+    Get the file index of a cached codebase, loading it from disk or, the
+    first time its commit is seen, embedding the files and saving it.
+    """
+    with cached.file_index_lock:
+        if cached.file_index is None:
+            index = FileIndex(cached.codebase)
+            index_path = os.path.join(SEMANTIC_INDEX_DIR, cached.repo_name, f"{cached.commit}.file.pkl")
+            if os.path.exists(index_path):
+                index.load(index_path)
+            else:
+                index.create()
+                os.makedirs(os.path.dirname(index_path), exist_ok=True)
+                # Other workers may load the file as soon as it exists, so it
+                # only appears once it is completely written
+                tmp_path = f"{index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                try:
+                    index.save(tmp_path)
+                    os.replace(tmp_path, index_path)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+            cached.file_index = QuantizedFileIndex(index)
+        return cached.file_index
+
+
+def search_similar_files_many(
+    cached: CachedCodebase, k: int, queries: List[str]
+) -> List[List[Tuple[str, float]]]:
+    """Find the k files most similar to each of several queries."""
+    if FileIndex is None:
+        return [
+            [(result.filepath, result.score) for result in semantic_search(cached.codebase, query, k=k, index_type="file").results]
+            for query in queries
         ]
 
+    return get_file_index(cached).search_many(queries, k)
+
+
+# Similar-files queries for the same repo arriving within SEARCH_BATCH_WAIT
+# seconds of each other are embedded and searched together
+SEARCH_BATCH_SIZE = int(os.environ.get("SEARCH_BATCH_SIZE", "32"))
+SEARCH_BATCH_WAIT = float(os.environ.get("SEARCH_BATCH_WAIT", "0.015"))
+
+
+class MicroBatcher:
+    """
+    Coalesces items submitted under the same key into one call of a blocking
+    batch handler. A batch is sent once it holds max_batch items or max_wait
+    seconds after its first item, whichever comes first, and each submitter
+    gets the result at its own position.
+    """
+
+    def __init__(self, handler, max_batch: int, max_wait: float):
+        self.handler = handler
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.pending: Dict[Any, List[Tuple[Any, asyncio.Future]]] = {}
+        self.timers: Dict[Any, asyncio.TimerHandle] = {}
+
+    async def submit(self, key: Any, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self.pending.setdefault(key, [])
+        batch.append((item, future))
+        if len(batch) >= self.max_batch:
+            self._dispatch(key)
+        elif len(batch) == 1:
+            self.timers[key] = loop.call_later(self.max_wait, self._dispatch, key)
+        return await future
+
+    def _dispatch(self, key: Any):
+        timer = self.timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self.pending.pop(key, None)
+        if batch:
+            task = asyncio.ensure_future(self._run(key, batch))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+
+    async def _run(self, key: Any, batch: List[Tuple[Any, asyncio.Future]]):
+        try:
+            results = await run_blocking(self.handler, *key, [item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+similar_files_batcher = MicroBatcher(search_similar_files_many, SEARCH_BATCH_SIZE, SEARCH_BATCH_WAIT)
+
+
+async def find_similar_files(cached: CachedCodebase, query: str, k: int) -> List[Tuple[str, float]]:
+    """Find the k files most similar to a query, batched with concurrent queries."""
+    return await similar_files_batcher.submit((cached, k), query)
+
+
+# Cached responses are reused for the same normalized query for up to
+# RESPONSE_CACHE_TTL seconds, or until the repo is reloaded at a new commit
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "256"))
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase a query and collapse its whitespace."""
+    return " ".join(query.lower().split())
+
+
+class ResponseCache:
+    """
+    Responses keyed by a namespace (endpoint and repo) and the normalized
+    query. Only identical queries match: near-identical wording often asks
+    a different question ("login" vs "logout", A calls B vs B calls A).
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Tuple[Tuple[str, str], str], Tuple[float, Any]]" = OrderedDict()
+        # Commit each repo's responses were computed at
+        self.commits: Dict[str, str] = {}
+
+    def get(self, namespace: Tuple[str, str], query: str) -> Optional[Any]:
+        key = (namespace, normalize_query(query))
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] >= self.ttl:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, namespace: Tuple[str, str], query: str, response: Any):
+        key = (namespace, normalize_query(query))
+        self.entries[key] = (time.monotonic(), response)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, repo_name: str):
+        """Drop every cached response for a repository."""
+        for key in [key for key in self.entries if key[0][1] == repo_name]:
+            del self.entries[key]
+
+    def track_commit(self, repo_name: str, commit: str):
+        """Drop a repository's responses once it is loaded at a different commit."""
+        if self.commits.get(repo_name, commit) != commit:
+            self.invalidate(repo_name)
+        self.commits[repo_name] = commit
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_TTL, RESPONSE_CACHE_SIZE)
+
+
+# Repos to clone and parse at startup, e.g. PREWARM_REPOS="owner/a,owner/b"
+PREWARM_REPOS = [name.strip() for name in os.environ.get("PREWARM_REPOS", "").split(",") if name.strip()]
+PREWARM_CONCURRENCY = int(os.environ.get("PREWARM_CONCURRENCY", "2"))
+
+_background_tasks = set()
+
+
+async def prewarm_codebases():
+    """Load the configured hot repos into the codebase cache."""
+    semaphore = asyncio.Semaphore(PREWARM_CONCURRENCY)
+
+    async def prewarm(repo_name: str):
+        async with semaphore:
+            try:
+                await get_codebase(repo_name)
+                print(f"Prewarmed codebase for {repo_name}")
+            except Exception as e:
+                print(f"Error prewarming codebase for {repo_name}: {e}")
+
+    await asyncio.gather(*(prewarm(repo_name) for repo_name in PREWARM_REPOS))
+
+
+@fastapi_app.on_event("startup")
+async def start_prewarm():
+    if PREWARM_REPOS:
+        task = asyncio.create_task(prewarm_codebases())
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+
+async def run_research(agent, query: str) -> str:
+    """Answer a research query with an agent."""
+    result = await agent.ainvoke(
+        {"input": query},
+        config={"configurable": {"session_id": f"research-{uuid.uuid4()}"}},
+    )
+    return result["output"]
+
+
+async def research_answer(repo_name: str, agent, query: str) -> str:
+    """
+    Answer a research query and cache the answer. Concurrent identical
+    queries, from /research or /research/batch, share one agent run.
+    """
+    output = await singleflight(
+        ("research", repo_name, normalize_query(query)),
+        lambda: run_research(agent, query),
+    )
+    response_cache.put(("research", repo_name), query, output)
+    return output
+
+
+@fastapi_app.post("/research", response_model=ResearchResponse)
+async def research(request: ResearchRequest, http_request: Request):
+    """
+    Endpoint to perform code research on a GitHub repository.
+    Clients that accept text/event-stream get the same event stream as
+    /research/stream instead of waiting for the whole response.
+    """
+    if "text/event-stream" in http_request.headers.get("accept", ""):
+        return StreamingResponse(research_events(request), media_type="text/event-stream", headers=SSE_HEADERS)
+
+    cache_key = ("research", request.repo_name)
+    if not request.no_cache:
+        cached = response_cache.get(cache_key, request.query)
+        if cached is not None:
+            return ResearchResponse(response=cached)
+
+    try:
         update_status("Initializing research agent...")
-        agent = create_agent_with_tools(
-            codebase=codebase,
-            tools=tools,
-            chat_history=[SystemMessage(content=RESEARCH_AGENT_PROMPT)],
-            verbose=True,
-        )
+        agent = await get_research_agent(request.repo_name)
 
         update_status("Running analysis...")
-        result = agent.invoke(
-            {"input": request.query},
-            config={"configurable": {"session_id": "research"}},
-        )
+        output = await research_answer(request.repo_name, agent, request.query)
 
         update_status("Complete")
-        return ResearchResponse(response=result["output"])
+        return ResearchResponse(response=output)
 
     except Exception as e:
         update_status("Error occurred")
         return ResearchResponse(response=f"Error during research: {str(e)}")
 
 
+@fastapi_app.post("/research/batch", response_model=BatchResearchResponse)
+async def research_batch(request: BatchResearchRequest) -> BatchResearchResponse:
+    """
+    Endpoint to run several research queries against one GitHub repository.
+    The codebase and agent are set up once and shared by all queries.
+    """
+    try:
+        agent = await get_research_agent(request.repo_name)
+    except Exception as e:
+        error = f"Error during research: {str(e)}"
+        return BatchResearchResponse(responses=[error] * len(request.queries))
+
+    semaphore = asyncio.Semaphore(RESEARCH_BATCH_CONCURRENCY)
+
+    async def run_query(query: str) -> str:
+        cached = response_cache.get(("research", request.repo_name), query)
+        if cached is not None:
+            return cached
+        async with semaphore:
+            try:
+                return await research_answer(request.repo_name, agent, query)
+            except Exception as e:
+                return f"Error during research: {str(e)}"
+
+    responses = await asyncio.gather(*(run_query(query) for query in request.queries))
+    return BatchResearchResponse(responses=list(responses))
+
+
 @fastapi_app.post("/similar-files", response_model=FilesResponse)
 async def similar_files(request: ResearchRequest) -> FilesResponse:
     """
     Endpoint to find similar files in a GitHub repository based on a query.
     """
+    cache_key = ("similar-files", request.repo_name)
+    if not request.no_cache:
+        cached = response_cache.get(cache_key, request.query)
+        if cached is not None:
+            return FilesResponse(files=cached)
+
     try:
-        codebase = Codebase.from_repo(request.repo_name)
-        search_result = semantic_search(codebase, request.query, k=5, index_type="file")
-        similar_file_names = [result.filepath for result in search_result.results]
+        cached = await get_cached_codebase(request.repo_name)
+        matches = await singleflight(
+            ("similar-files", request.repo_name, normalize_query(request.query)),
+            lambda: find_similar_files(cached, request.query, 5),
+        )
+        similar_file_names = [filepath for filepath, _ in matches]
+        response_cache.put(cache_key, request.query, similar_file_names)
         return FilesResponse(files=similar_file_names)
 
     except Exception as e:
@@ -240,61 +802,298 @@ async def similar_files(request: ResearchRequest) -> FilesResponse:
         return FilesResponse(files=[f"Error finding similar files: {str(e)}"])
 
 
+# Analyzed code agents keyed by repo name, with the codebase they were built for
+_code_agent_cache: Dict[str, Tuple[Codebase, CodeAgent]] = {}
+_code_agent_locks: Dict[str, asyncio.Lock] = {}
+# Codebase stats keyed by repo name, with the codebase they describe
+_stats_cache: Dict[str, Tuple[Codebase, Dict[str, Any]]] = {}
+
+
+async def get_code_agent(repo_name: str) -> Tuple[Codebase, CodeAgent]:
+    """
+    Get the analyzed code agent for a repository, with the codebase it was
+    built for. The analysis runs once per parsed codebase, so it is redone
+    only when the codebase is reloaded.
+    """
+    codebase = await get_codebase(repo_name)
+    lock = _code_agent_locks.setdefault(repo_name, asyncio.Lock())
+    async with lock:
+        cached = _code_agent_cache.get(repo_name)
+        if cached is None or cached[0] is not codebase:
+            code_agent = await run_blocking(partial(CodeAgent, codebase, analyze_codebase=True))
+            cached = _code_agent_cache[repo_name] = (codebase, code_agent)
+    return cached
+
+
+async def compute_codebase_stats(repo_name: str) -> Tuple[Codebase, Dict[str, Any]]:
+    """Summarize a codebase with its analyzed code agent, returning the codebase too."""
+    codebase, code_agent = await get_code_agent(repo_name)
+    return codebase, await run_blocking(code_agent.get_codebase_stats)
+
+
 @fastapi_app.post("/codebase-stats", response_model=CodebaseStatsResponse)
 async def codebase_stats(request: ResearchRequest) -> CodebaseStatsResponse:
     """
     Endpoint to get statistics about a codebase.
     """
     try:
-        codebase = Codebase.from_repo(request.repo_name)
-        code_agent = CodeAgent(codebase, analyze_codebase=True)
-        stats = code_agent.get_codebase_stats()
-        return CodebaseStatsResponse(stats=stats)
+        codebase = await get_codebase(request.repo_name)
+        cached = _stats_cache.get(request.repo_name)
+        if cached is not None and cached[0] is codebase:
+            return CodebaseStatsResponse(stats=cached[1])
+
+        # Stored with the codebase they were computed from, which may have
+        # been reloaded since the lookup above
+        cached = await singleflight(("codebase-stats", request.repo_name), lambda: compute_codebase_stats(request.repo_name))
+        _stats_cache[request.repo_name] = cached
+        return CodebaseStatsResponse(stats=cached[1])
     except Exception as e:
         update_status("Error occurred")
         return CodebaseStatsResponse(stats={"error": str(e)})
 
 
+def invalidate_repo(repo_name: str):
+    """
+    Drop everything cached for a repository so that the next request
+    checks it out, parses and analyzes it again.
+    """
+    repo_name = normalize_repo_name(repo_name)
+    _codebase_cache.pop(repo_name, None)
+    _agent_cache.pop(repo_name, None)
+    _code_agent_cache.pop(repo_name, None)
+    _stats_cache.pop(repo_name, None)
+    response_cache.invalidate(repo_name)
+
+
+@fastapi_app.post("/invalidate", response_model=StatusResponse)
+async def invalidate(request: InvalidateRequest) -> StatusResponse:
+    """
+    Endpoint to discard the cached codebase, agents and responses of a repository.
+    """
+    invalidate_repo(request.repo_name)
+    return StatusResponse(status="invalidated")
+
+
+# Secret configured on the GitHub webhook, used to verify its deliveries
+GITHUB_WEBHOOK_SECRET = os.environ.get("GITHUB_WEBHOOK_SECRET")
+
+
+@fastapi_app.post("/webhooks/github", response_model=StatusResponse)
+async def github_webhook(http_request: Request) -> StatusResponse:
+    """
+    Endpoint for GitHub push webhooks. A push to a repository discards what
+    is cached for it, so the next question sees the new commits.
+    """
+    # Unsigned deliveries could be used to flush the caches at will
+    if not GITHUB_WEBHOOK_SECRET:
+        raise HTTPException(status_code=503, detail="GITHUB_WEBHOOK_SECRET is not configured")
+
+    body = await http_request.body()
+    expected = "sha256=" + hmac.new(GITHUB_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(expected, http_request.headers.get("x-hub-signature-256", "")):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+
+    if http_request.headers.get("x-github-event") != "push":
+        return StatusResponse(status="ignored")
+
+    try:
+        full_name = orjson.loads(body)["repository"]["full_name"]
+    except (orjson.JSONDecodeError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid push payload")
+    if not isinstance(full_name, str):
+        raise HTTPException(status_code=400, detail="Invalid push payload")
+
+    invalidate_repo(full_name)
+    return StatusResponse(status="invalidated")
+
+
+# Fields of a symbol definition/reference returned by /symbol-info
+SYMBOL_LOCATION_FIELDS = ("name", "filepath", "line", "column", "context")
+
+
+def project_fields(obj: Any, fields=SYMBOL_LOCATION_FIELDS) -> Dict[str, Any]:
+    """Copy only the given fields of an object into a dict."""
+    return {field: getattr(obj, field, None) for field in fields}
+
+
+def render_symbol_info(symbol_result) -> bytes:
+    """Encode a reveal_symbol result as a SymbolResponse JSON body."""
+    symbol_info = {
+        "name": symbol_result.symbol_name,
+        "type": symbol_result.symbol_type,
+        "definition": project_fields(symbol_result.definition) if symbol_result.definition else None,
+        "source_code": symbol_result.source_code,
+        "docstring": symbol_result.docstring,
+        "references": [project_fields(ref) for ref in symbol_result.references],
+        "metadata": symbol_result.metadata,
+        "status": symbol_result.status,
+        "error": symbol_result.error
+    }
+    return orjson.dumps({"symbol_info": symbol_info}, default=str)
+
+
 @fastapi_app.post("/symbol-info", response_model=SymbolResponse)
 async def symbol_info(request: SymbolRequest) -> SymbolResponse:
     """
     Endpoint to get information about a symbol in the codebase.
     """
     try:
-        codebase = Codebase.from_repo(request.repo_name)
-        symbol_result = reveal_symbol(
-            codebase, 
-            request.symbol_name, 
-            filepath=request.filepath,
-            include_source=True,
-            include_references=True
+        codebase = await get_codebase(request.repo_name)
+        symbol_result = await run_blocking(
+            partial(
+                reveal_symbol,
+                codebase,
+                request.symbol_name,
+                filepath=request.filepath,
+                include_source=True,
+                include_references=True,
+            )
         )
-        
-        # Convert to dictionary for response
-        symbol_info = {
-            "name": symbol_result.symbol_name,
-            "type": symbol_result.symbol_type,
-            "definition": symbol_result.definition.__dict__ if symbol_result.definition else None,
-            "source_code": symbol_result.source_code,
-            "docstring": symbol_result.docstring,
-            "references": [ref.__dict__ for ref in symbol_result.references],
-            "metadata": symbol_result.metadata,
-            "status": symbol_result.status,
-            "error": symbol_result.error
-        }
-        
-        return SymbolResponse(symbol_info=symbol_info)
+
+        # Symbols can have thousands of references, so encode the body off the
+        # event loop and skip re-validating it against SymbolResponse
+        body = await run_blocking(render_symbol_info, symbol_result)
+        return Response(body, media_type="application/json")
     except Exception as e:
         return SymbolResponse(symbol_info={"status": "error", "error": str(e)})
 
 
 # GitHub API integration
-async def get_github_token():
-    """Get GitHub API token from environment variable"""
-    token = os.environ.get("GITHUB_API_KEY")
-    if not token:
+# One client for all GitHub calls, so connections are pooled and reused
+github_client = httpx.AsyncClient(
+    http2=True,
+    timeout=10.0,
+    limits=httpx.Limits(max_keepalive_connections=100, max_connections=1000),
+    headers={"Accept": "application/vnd.github.v3+json"},
+)
+
+
+@fastapi_app.on_event("shutdown")
+async def close_github_client():
+    await github_client.aclose()
+
+
+# Parsed GitHub search results are reused for GITHUB_CACHE_TTL seconds, or
+# until the rate limit resets when few calls are left
+GITHUB_CACHE_TTL = float(os.environ.get("GITHUB_CACHE_TTL", "120"))
+GITHUB_CACHE_SIZE = 256
+GITHUB_RATE_LIMIT_LOW = 5
+# Bytes of a GitHub error body passed on in our own error detail
+GITHUB_ERROR_DETAIL_SIZE = 512
+
+_github_cache: "OrderedDict[tuple, Tuple[float, GitHubSearchResponse]]" = OrderedDict()
+
+
+def get_cached_github_response(key: tuple) -> Optional[GitHubSearchResponse]:
+    cached = _github_cache.get(key)
+    if cached is None or cached[0] < time.time():
+        return None
+    _github_cache.move_to_end(key)
+    return cached[1]
+
+
+def cache_github_response(key: tuple, result: GitHubSearchResponse, response: httpx.Response):
+    expires_at = time.time() + GITHUB_CACHE_TTL
+    remaining = response.headers.get("x-ratelimit-remaining")
+    reset = response.headers.get("x-ratelimit-reset")
+    if remaining is not None and reset is not None:
+        try:
+            if int(remaining) <= GITHUB_RATE_LIMIT_LOW:
+                expires_at = max(expires_at, float(reset))
+        except ValueError:
+            # A malformed header only loses the rate limit extension
+            pass
+    _github_cache[key] = (expires_at, result)
+    _github_cache.move_to_end(key)
+    while len(_github_cache) > GITHUB_CACHE_SIZE:
+        _github_cache.popitem(last=False)
+
+
+def github_repository(repo: Dict[str, Any]) -> GitHubRepository:
+    """
+    Build a GitHubRepository from a GitHub API item without validating it,
+    since GitHub's own responses already have the right types.
+    """
+    return GitHubRepository.model_construct(
+        id=repo["id"],
+        name=repo["name"],
+        full_name=repo["full_name"],
+        html_url=repo["html_url"],
+        description=repo.get("description"),
+        owner=repo["owner"],
+        stargazers_count=repo["stargazers_count"],
+        forks_count=repo["forks_count"],
+        language=repo.get("language"),
+        topics=repo.get("topics", []),
+        updated_at=repo["updated_at"],
+        created_at=repo["created_at"]
+    )
+
+
+async def get_github_client() -> httpx.AsyncClient:
+    """Get the shared GitHub API client"""
+    return github_client
+
+
+# The token is fixed for the life of the process, so its header is built once
+GITHUB_API_KEY = os.environ.get("GITHUB_API_KEY")
+GITHUB_AUTH_HEADERS = {"Authorization": f"token {GITHUB_API_KEY}"} if GITHUB_API_KEY else None
+
+
+async def get_github_headers() -> Dict[str, str]:
+    """Get the GitHub API authorization headers"""
+    if GITHUB_AUTH_HEADERS is None:
         raise HTTPException(status_code=500, detail="GitHub API token not configured")
-    return token
+    return GITHUB_AUTH_HEADERS
+
+
+async def search_github(
+    client: httpx.AsyncClient,
+    headers: Dict[str, str],
+    query: str,
+    sort: Optional[str] = None,
+    order: str = "desc",
+    page: int = 1,
+    per_page: int = 10,
+) -> GitHubSearchResponse:
+    """Search GitHub repositories, reusing recent results for the same search."""
+    params = {
+        "q": query,
+        "page": page,
+        "per_page": per_page
+    }
+    
+    if sort:
+        params["sort"] = sort
+        params["order"] = order
+    
+    cache_key = (query, sort, order if sort else None, page, per_page)
+    cached = get_cached_github_response(cache_key)
+    if cached is not None:
+        return cached
+    
+    # Make the request to GitHub API
+    response = await client.get(
+        "https://api.github.com/search/repositories",
+        headers=headers,
+        params=params
+    )
+    
+    if response.status_code != 200:
+        raise HTTPException(
+            status_code=response.status_code,
+            detail=f"GitHub API error: {response.content[:GITHUB_ERROR_DETAIL_SIZE].decode(errors='replace')}"
+        )
+    
+    data = orjson.loads(response.content)
+    
+    # Transform the response to match our model
+    result = GitHubSearchResponse.model_construct(
+        total_count=data.get("total_count", 0),
+        items=[github_repository(repo) for repo in data.get("items", ())]
+    )
+    cache_github_response(cache_key, result, response)
+    return result
 
 
 @fastapi_app.get("/github/search", response_model=GitHubSearchResponse)
@@ -306,76 +1105,25 @@ async def search_github_repositories(
     order: str = "desc",
     page: int = 1,
     per_page: int = 10,
-    token: str = Depends(get_github_token)
+    headers: Dict[str, str] = Depends(get_github_headers),
+    client: httpx.AsyncClient = Depends(get_github_client)
 ):
     """
     Search for GitHub repositories with various filters
     """
     try:
-        # Build the GitHub search query
-        search_query = query
-        
+        # Build the GitHub search query, normalized so that equivalent
+        # searches share a cache entry
+        language = (language or "").strip().lower() or None
+        parts = [" ".join(query.split())]
         if language:
-            search_query += f" language:{language}"
-        
+            parts.append(f"language:{language}")
         if min_stars:
-            search_query += f" stars:>={min_stars}"
-        
-        # Set up the GitHub API request
-        headers = {
-            "Accept": "application/vnd.github.v3+json",
-            "Authorization": f"token {token}"
-        }
+            parts.append(f"stars:>={min_stars}")
+        search_query = " ".join(parts)
         
-        params = {
-            "q": search_query,
-            "page": page,
-            "per_page": per_page
-        }
+        return await search_github(client, headers, search_query, sort, order, page, per_page)
         
-        if sort:
-            params["sort"] = sort
-            params["order"] = order
-        
-        # Make the request to GitHub API
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                "https://api.github.com/search/repositories",
-                headers=headers,
-                params=params
-            )
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"GitHub API error: {response.text}"
-                )
-            
-            data = response.json()
-            
-            # Transform the response to match our model
-            items = []
-            for repo in data.get("items", []):
-                items.append(GitHubRepository(
-                    id=repo["id"],
-                    name=repo["name"],
-                    full_name=repo["full_name"],
-                    html_url=repo["html_url"],
-                    description=repo.get("description"),
-                    owner=repo["owner"],
-                    stargazers_count=repo["stargazers_count"],
-                    forks_count=repo["forks_count"],
-                    language=repo.get("language"),
-                    topics=repo.get("topics", []),
-                    updated_at=repo["updated_at"],
-                    created_at=repo["created_at"]
-                ))
-            
-            return GitHubSearchResponse(
-                total_count=data.get("total_count", 0),
-                items=items
-            )
-            
     except HTTPException:
         raise
     except Exception as e:
@@ -386,7 +1134,8 @@ async def search_github_repositories(
 async def get_trending_repositories(
     language: Optional[str] = None,
     since: str = "daily",
-    token: str = Depends(get_github_token)
+    headers: Dict[str, str] = Depends(get_github_headers),
+    client: httpx.AsyncClient = Depends(get_github_client)
 ):
     """
     Get trending GitHub repositories
@@ -406,63 +1155,11 @@ async def get_trending_repositories(
         date_str = date_range.strftime("%Y-%m-%d")
         
         # Build query for trending repositories
-        query = f"created:>{date_str}"
-        
-        if language:
-            query += f" language:{language}"
-        
-        # Set up the GitHub API request
-        headers = {
-            "Accept": "application/vnd.github.v3+json",
-            "Authorization": f"token {token}"
-        }
+        language = (language or "").strip().lower() or None
+        query = f"created:>{date_str} language:{language}" if language else f"created:>{date_str}"
         
-        params = {
-            "q": query,
-            "sort": "stars",
-            "order": "desc",
-            "per_page": 10
-        }
+        return await search_github(client, headers, query, sort="stars", order="desc")
         
-        # Make the request to GitHub API
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                "https://api.github.com/search/repositories",
-                headers=headers,
-                params=params
-            )
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"GitHub API error: {response.text}"
-                )
-            
-            data = response.json()
-            
-            # Transform the response to match our model
-            items = []
-            for repo in data.get("items", []):
-                items.append(GitHubRepository(
-                    id=repo["id"],
-                    name=repo["name"],
-                    full_name=repo["full_name"],
-                    html_url=repo["html_url"],
-                    description=repo.get("description"),
-                    owner=repo["owner"],
-                    stargazers_count=repo["stargazers_count"],
-                    forks_count=repo["forks_count"],
-                    language=repo.get("language"),
-                    topics=repo.get("topics", []),
-                    updated_at=repo["updated_at"],
-                    created_at=repo["created_at"]
-                ))
-            
-            return GitHubSearchResponse(
-                total_count=data.get("total_count", 0),
-                items=items
-            )
-            
     except HTTPException:
         raise
     except Exception as e:
@@ -478,14 +1175,6 @@ async def save_repository(request: SaveRepositoryRequest):
     try:
         repo_id = request.repository.id
         
-        # Check if repository already exists
-        if repo_id in saved_repositories:
-            # Update categories if provided
-            if request.categories:
-                saved_repositories[repo_id].categories = request.categories
-            return {"message": "Repository updated", "repository_id": repo_id}
-        
-        # Create new saved repository
         saved_repo = SavedRepository(
             id=request.repository.id,
             name=request.repository.name,
@@ -499,10 +1188,11 @@ async def save_repository(request: SaveRepositoryRequest):
             topics=request.repository.topics,
             updated_at=request.repository.updated_at,
             created_at=request.repository.created_at,
-            categories=request.categories
         )
         
-        saved_repositories[repo_id] = saved_repo
+        # An already saved repository only has its categories updated, if provided
+        if not await store.save_repo(saved_repo.model_dump(exclude={"categories"}), request.categories):
+            return {"message": "Repository updated", "repository_id": repo_id}
         
         return {"message": "Repository saved", "repository_id": repo_id}
     except Exception as e:
@@ -510,21 +1200,18 @@ async def save_repository(request: SaveRepositoryRequest):
 
 
 @fastapi_app.get("/user/repositories")
-async def get_saved_repositories(category: Optional[str] = None):
+async def get_saved_repositories(
+    category: Optional[str] = None,
+    language: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: int = 0,
+):
     """
-    Get user's saved repositories with optional category filter
+    Get user's saved repositories with optional category and language filters
     """
     try:
-        if category:
-            # Filter repositories by category
-            filtered_repos = [
-                repo for repo in saved_repositories.values()
-                if category in repo.categories
-            ]
-            return {"repositories": filtered_repos, "count": len(filtered_repos)}
-        else:
-            # Return all repositories
-            return {"repositories": list(saved_repositories.values()), "count": len(saved_repositories)}
+        repos = [SavedRepository(**repo) for repo in await store.list_repos(category, language, limit, offset)]
+        return {"repositories": repos, "count": len(repos)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving repositories: {str(e)}")
 
@@ -535,13 +1222,11 @@ async def delete_repository(repo_id: int):
     Remove a repository from user's dashboard
     """
     try:
-        if repo_id not in saved_repositories:
+        deleted_repo = await store.delete_repo(repo_id)
+        if deleted_repo is None:
             raise HTTPException(status_code=404, detail="Repository not found")
         
-        # Remove the repository
-        deleted_repo = saved_repositories.pop(repo_id)
-        
-        return {"message": "Repository removed", "repository": deleted_repo}
+        return {"message": "Repository removed", "repository": SavedRepository(**deleted_repo)}
     except HTTPException:
         raise
     except Exception as e:
@@ -558,18 +1243,14 @@ async def create_category(request: CreateCategoryRequest):
         # Generate a simple ID for the category
         category_id = request.name.lower().replace(" ", "-")
         
-        # Check if category already exists
-        if category_id in categories:
-            raise HTTPException(status_code=400, detail="Category already exists")
-        
-        # Create new category
         new_category = Category(
             id=category_id,
             name=request.name,
             color=request.color
         )
         
-        categories[category_id] = new_category
+        if not await store.create_category(new_category.model_dump()):
+            raise HTTPException(status_code=400, detail="Category already exists")
         
         return {"message": "Category created", "category": new_category}
     except HTTPException:
@@ -584,7 +1265,8 @@ async def get_categories():
     Get all repository categories
     """
     try:
-        return {"categories": list(categories.values()), "count": len(categories)}
+        categories = [Category(**category) for category in await store.list_categories()]
+        return {"categories": categories, "count": len(categories)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving categories: {str(e)}")
 
@@ -595,32 +1277,153 @@ async def delete_category(category_id: str):
     Delete a repository category
     """
     try:
-        if category_id not in categories:
+        # Deleting a category also removes it from all repositories
+        deleted_category = await store.delete_category(category_id)
+        if deleted_category is None:
             raise HTTPException(status_code=404, detail="Category not found")
         
-        # Remove the category
-        deleted_category = categories.pop(category_id)
-        
-        # Remove this category from all repositories
-        for repo in saved_repositories.values():
-            if category_id in repo.categories:
-                repo.categories.remove(category_id)
-        
-        return {"message": "Category deleted", "category": deleted_category}
+        return {"message": "Category deleted", "category": Category(**deleted_category)}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting category: {str(e)}")
 
 
+# Agent events forwarded to /research/stream clients; everything else is dropped
+STREAMED_EVENT_KINDS = frozenset({"on_chat_model_stream", "on_tool_start", "on_tool_end"})
+# Token frames are the bulk of the stream, so their JSON envelope is prebuilt
+CONTENT_FRAME_PREFIX = b'data: {"type":"content","content":'
+FRAME_SUFFIX = b"}\n\n"
+
+
+def sse_frame(payload: Dict[str, Any]) -> bytes:
+    """Encode a payload as a server-sent event frame."""
+    return b"data: " + orjson.dumps(payload, default=str) + b"\n\n"
+
+
+# Streamed tokens are sent at most this many seconds after they arrive...
+TOKEN_FLUSH_INTERVAL = float(os.environ.get("TOKEN_FLUSH_INTERVAL", "0.03"))
+# ...or as soon as this many characters are waiting
+TOKEN_FLUSH_SIZE = int(os.environ.get("TOKEN_FLUSH_SIZE", "256"))
+
+# Keep caches and reverse proxies such as nginx from holding back frames
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+async def coalesce_agent_events(events):
+    """
+    Yield (kind, data) pairs for the agent events streamed to clients.
+    Consecutive chat model tokens are merged into one ("content", text) pair
+    per TOKEN_FLUSH_INTERVAL or TOKEN_FLUSH_SIZE, whichever comes first.
+    Tool events flush any waiting tokens before they are passed through.
+    """
+    loop = asyncio.get_running_loop()
+    iterator = events.__aiter__()
+    pending = []
+    pending_size = 0
+    deadline = None
+    next_event = None
+    try:
+        while True:
+            if next_event is None:
+                next_event = asyncio.ensure_future(iterator.__anext__())
+            timeout = None if deadline is None else max(0.0, deadline - loop.time())
+            done, _ = await asyncio.wait({next_event}, timeout=timeout)
+            if not done:
+                yield "content", "".join(pending)
+                pending, pending_size, deadline = [], 0, None
+                continue
+
+            try:
+                event = next_event.result()
+            except StopAsyncIteration:
+                next_event = None
+                break
+            next_event = None
+
+            kind = event["event"]
+            if kind not in STREAMED_EVENT_KINDS:
+                continue
+            if kind == "on_chat_model_stream":
+                content = event["data"]["chunk"].content
+                if content:
+                    pending.append(content)
+                    pending_size += len(content)
+                    if deadline is None:
+                        deadline = loop.time() + TOKEN_FLUSH_INTERVAL
+                    if pending_size >= TOKEN_FLUSH_SIZE:
+                        yield "content", "".join(pending)
+                        pending, pending_size, deadline = [], 0, None
+            else:
+                if pending:
+                    yield "content", "".join(pending)
+                    pending, pending_size, deadline = [], 0, None
+                yield kind, event["data"]
+
+        if pending:
+            yield "content", "".join(pending)
+    finally:
+        # Stop the agent run too when the client goes away. The pending
+        # __anext__ has to finish before the generator can be closed
+        if next_event is not None:
+            next_event.cancel()
+            await asyncio.wait({next_event})
+            if not next_event.cancelled():
+                next_event.exception()
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            try:
+                await aclose()
+            except Exception as e:
+                print(f"Error closing agent event stream: {e}")
+
+
+def create_research_agent(codebase: Codebase):
+    """Build the research tools and agent for a codebase."""
+    tools = [
+        ViewFileTool(codebase),
+        ListDirectoryTool(codebase),
+        SearchTool(codebase),
+        SemanticSearchTool(codebase),
+        RevealSymbolTool(codebase),
+    ]
+    return create_agent_with_tools(
+        codebase=codebase,
+        tools=tools,
+        chat_history=[SystemMessage(content=RESEARCH_AGENT_PROMPT)],
+        verbose=True,
+    )
+
+
+# Research agents keyed by repo name, with the codebase they were built for
+_agent_cache: Dict[str, tuple] = {}
+_agent_locks: Dict[str, asyncio.Lock] = {}
+
+
+async def get_research_agent(repo_name: str):
+    """
+    Get the research agent for a repository, building it on first use.
+    Agents are reused across requests; callers pass a fresh session_id per
+    invocation so chat histories stay separate.
+    """
+    codebase = await get_codebase(repo_name)
+    lock = _agent_locks.setdefault(repo_name, asyncio.Lock())
+    async with lock:
+        cached = _agent_cache.get(repo_name)
+        if cached is None or cached[0] is not codebase:
+            agent = await run_blocking(create_research_agent, codebase)
+            cached = _agent_cache[repo_name] = (codebase, agent)
+    return cached[1]
+
+
 # Function to get similar files - used in both Modal and local environments
 async def get_similar_files_func(repo_name: str, query: str) -> List[str]:
     """
     Function to find similar files
     """
-    codebase = Codebase.from_repo(repo_name)
-    search_result = semantic_search(codebase, query, k=6, index_type="file")
-    return [result.filepath for result in search_result.results if result.score > 0.2]
+    cached = await get_cached_codebase(repo_name)
+    matches = await find_similar_files(cached, query, 6)
+    return [filepath for filepath, score in matches if score > 0.2]
 
 
 # Modal function for cloud deployment
@@ -632,76 +1435,105 @@ async def get_similar_files(repo_name: str, query: str) -> List[str]:
     return await get_similar_files_func(repo_name, query)
 
 
-@fastapi_app.post("/research/stream")
-async def research_stream(request: ResearchRequest):
+# Caps in-flight remote similar-files calls from this process
+MODAL_MAX_CONCURRENCY = int(os.environ.get("MODAL_MAX_CONCURRENCY", "16"))
+_modal_semaphore = asyncio.Semaphore(MODAL_MAX_CONCURRENCY)
+
+
+async def get_similar_files_remote(repo_name: str, query: str) -> List[str]:
+    """Call the Modal similar-files function, waiting for a free slot."""
+    async with _modal_semaphore:
+        return await get_similar_files.remote.aio(repo_name, query)
+
+
+async def get_research_similar_files(request: ResearchRequest) -> List[str]:
+    """Get the similar files sent ahead of a streamed research response."""
+    cache_key = ("research-similar-files", request.repo_name)
+    if not request.no_cache:
+        cached = response_cache.get(cache_key, request.query)
+        if cached is not None:
+            return cached
+
+    # Handle similar files differently based on environment
+    if os.environ.get("RUNNING_LOCALLY") == "true":
+        lookup = get_similar_files_func
+    else:
+        lookup = get_similar_files_remote
+    similar_files = await singleflight(
+        ("research-similar-files", request.repo_name, normalize_query(request.query)),
+        lambda: lookup(request.repo_name, request.query),
+    )
+
+    response_cache.put(cache_key, request.query, similar_files)
+    return similar_files
+
+
+async def research_events(request: ResearchRequest):
     """
-    Streaming endpoint to perform code research on a GitHub repository.
+    Run a research query, yielding server-sent event frames for status
+    updates, the similar files, the agent's output as it is produced, and
+    finally the complete response.
     """
-    try:
-        async def event_generator():
-            final_response = ""
+    response_parts = []
+    statuses = asyncio.Queue()
+    status_queue.set(statuses)
 
-            # Handle similar files differently based on environment
-            if os.environ.get("RUNNING_LOCALLY") == "true":
-                similar_files = await get_similar_files_func(request.repo_name, request.query)
-            else:
-                similar_files_future = get_similar_files.remote.aio(
-                    request.repo_name, request.query
-                )
-                similar_files = await similar_files_future
-
-            codebase = Codebase.from_repo(request.repo_name)
-            tools = [
-                ViewFileTool(codebase),
-                ListDirectoryTool(codebase),
-                SearchTool(codebase),
-                SemanticSearchTool(codebase),
-                RevealSymbolTool(codebase),
-            ]
-
-            agent = create_agent_with_tools(
-                codebase=codebase,
-                tools=tools,
-                chat_history=[SystemMessage(content=RESEARCH_AGENT_PROMPT)],
-                verbose=True,
-            )
+    try:
+        # Clone the repo and build the agent while the similar files are looked up
+        update_status("Initializing research agent...")
+        agent_task = asyncio.create_task(get_research_agent(request.repo_name))
 
-            research_task = agent.astream_events(
-                {"input": request.query},
-                version="v1",
-                config={"configurable": {"session_id": "research"}},
-            )
+        similar_files_task = asyncio.create_task(get_research_similar_files(request))
 
-            yield f"data: {json.dumps({'type': 'similar_files', 'content': similar_files})}\\n\\n"
+        try:
+            similar_files = await similar_files_task
+        except Exception:
+            agent_task.cancel()
+            raise
 
-            async for event in research_task:
-                kind = event["event"]
-                if kind == "on_chat_model_stream":
-                    content = event["data"]["chunk"].content
-                    if content:
-                        final_response += content
-                        yield f"data: {json.dumps({'type': 'content', 'content': content})}\\n\\n"
-                elif kind in ["on_tool_start", "on_tool_end"]:
-                    yield f"data: {json.dumps({'type': kind, 'data': event['data']})}\\n\\n"
+        # Send the similar files right away instead of after agent setup
+        for status in drain_statuses(statuses):
+            yield sse_frame(status)
+        yield sse_frame({"type": "similar_files", "content": similar_files})
 
-            yield f"data: {json.dumps({'type': 'complete', 'content': final_response})}\\n\\n"
+        agent = await agent_task
+        update_status("Running analysis...")
+        for status in drain_statuses(statuses):
+            yield sse_frame(status)
 
-        return StreamingResponse(
-            event_generator(),
-            media_type="text/event-stream",
+        research_task = agent.astream_events(
+            {"input": request.query},
+            version="v1",
+            config={"configurable": {"session_id": f"research-{uuid.uuid4()}"}},
         )
 
+        async for kind, data in coalesce_agent_events(research_task):
+            if kind == "content":
+                response_parts.append(data)
+                yield CONTENT_FRAME_PREFIX + orjson.dumps(data) + FRAME_SUFFIX
+            else:
+                yield sse_frame({"type": kind, "data": data})
+
+        response = "".join(response_parts)
+        response_cache.put(("research", request.repo_name), request.query, response)
+        update_status("Complete")
+        for status in drain_statuses(statuses):
+            yield sse_frame(status)
+        yield sse_frame({"type": "complete", "content": response})
+
     except Exception as e:
-        error_status = update_status("Error occurred")
-        return StreamingResponse(
-            iter(
-                [
-                    f"data: {json.dumps(error_status)}\\n\\n",
-                    f"data: {json.dumps({'type': 'error', 'content': str(e)})}\\n\\n",
-                ]
-            ),
-            media_type="text/event-stream",
-        )
+        update_status("Error occurred")
+        for status in drain_statuses(statuses):
+            yield sse_frame(status)
+        yield sse_frame({"type": "error", "content": str(e)})
+
+
+@fastapi_app.post("/research/stream")
+async def research_stream(request: ResearchRequest):
+    """
+    Streaming endpoint to perform code research on a GitHub repository.
+    """
+    return StreamingResponse(research_events(request), media_type="text/event-stream", headers=SSE_HEADERS)
 
 
 # Modal app deployment
@@ -719,6 +1551,20 @@ if __name__ == "__main__":
     else:
         # Set environment variable to indicate we're running locally
         os.environ["RUNNING_LOCALLY"] = "true"
-        # Run the FastAPI app locally with uvicorn
-        print("Starting local API server at http://localhost:8000")
-        uvicorn.run(fastapi_app, host="0.0.0.0", port=8000)
+        # Run the FastAPI app locally with uvicorn. Parsed codebases, file
+        # indexes, agents and cached responses all live in the worker process,
+        # and /invalidate and the push webhook only clear the worker that
+        # handles them. So the default is one worker: more workers parse and
+        # hold every repo once each, and keep serving stale answers after an
+        # invalidation. Raise WEB_CONCURRENCY only if that is acceptable
+        workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+        print(f"Starting local API server at http://localhost:8000 with {workers} workers")
+        uvicorn.run(
+            "api:fastapi_app",
+            host="0.0.0.0",
+            port=8000,
+            workers=workers,
+            # uvloop does not support Windows
+            loop="asyncio" if sys.platform == "win32" else "uvloop",
+            http="httptools",
+        )
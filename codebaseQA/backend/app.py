@@ -3,407 +3,534 @@ FastAPI app for the CodeHub backend.
 This app provides API endpoints for interacting with the Codegen SDK.
 """
 
+import asyncio
+import hashlib
+import logging
 import os
-from typing import Dict, List, Optional, Any, Union
-from fastapi import FastAPI, HTTPException, Depends
-from pydantic import BaseModel
+import sys
+import threading
+from collections import OrderedDict
+from functools import lru_cache, partial
+from itertools import islice
+
+import anyio
+import orjson
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, Tuple, Any
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from pydantic import BaseModel, ConfigDict, field_validator
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from .services.codegen_sdk_service import CodegenSDKService
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from fastapi.routing import APIRoute
+from .services.codegen_sdk_service import CodegenSDKService, normalize_path
+
+class CodeHubJSONResponse(ORJSONResponse):
+    """orjson response that also accepts non-string keys and numpy values."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+logger = logging.getLogger(__name__)
+
+def error_payload(exc: Exception) -> Dict[str, str]:
+    """
+    Describe an error for clients. Uses the exception's own message when it
+    has one, rather than str(), which can format long argument lists.
+    `detail` is kept because the frontend reads it.
+    """
+    message = exc.args[0] if exc.args and isinstance(exc.args[0], str) else str(exc)
+    return {"detail": message, "error_type": type(exc).__name__}
+
+class CodeHubRoute(APIRoute):
+    """
+    Route that turns any unexpected error into a 500 with the error message
+    as its detail. Errors are handled here rather than in an app-wide
+    exception handler so the response still passes through CORSMiddleware.
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request):
+            try:
+                return await handler(request)
+            except (HTTPException, RequestValidationError):
+                raise
+            except Exception as e:
+                logger.exception("%s %s failed", request.method, request.url.path)
+                return CodeHubJSONResponse(error_payload(e), status_code=500)
+
+        return route_handler
+
+app = FastAPI(
+    title="CodeHub Backend",
+    description="Backend API for CodeHub",
+    default_response_class=CodeHubJSONResponse,
+)
+app.router.route_class = CodeHubRoute
 
-app = FastAPI(title="CodeHub Backend", description="Backend API for CodeHub")
+# Comma-separated list of origins allowed to call this API from a browser.
+# The Next.js frontend calls this backend server-side, so only local
+# development needs browser access by default
+CORS_ORIGINS = os.environ.get("CORS_ORIGINS", "http://localhost:3000").split(",")
 
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "Accept", "X-API-Key", "If-None-Match"],
+    expose_headers=["ETag"],
+    max_age=86400,
 )
 
 # Models
-class CodebaseRequest(BaseModel):
+class RequestModel(BaseModel):
+    """Request body. Bodies are only read, so they are frozen and unknown fields are dropped."""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+    @field_validator("codebase_path", check_fields=False)
+    @classmethod
+    def canonicalize_codebase_path(cls, value: str) -> str:
+        return normalize_path(value)
+
+class CodebaseRequest(RequestModel):
+    codebase_path: str
+    api_key: str
+
+class AnalyzeRequest(CodebaseRequest):
+    # One list per field instead of one object per file/function/class
+    columnar: bool = False
+
+class DeadCodeRequest(RequestModel):
     codebase_path: str
     api_key: str
+    limit: Optional[int] = 200
+    offset: int = 0
+    include_source: bool = False
 
-class FileOperationRequest(BaseModel):
+class FileOperationRequest(RequestModel):
     codebase_path: str
     file_path: str
     content: Optional[str] = None
     api_key: str
 
-class SymbolOperationRequest(BaseModel):
+class SymbolOperationRequest(RequestModel):
     codebase_path: str
     symbol_name: str
     new_name: Optional[str] = None
     target_file: Optional[str] = None
     api_key: str
 
-class SemanticEditRequest(BaseModel):
+class SemanticEditRequest(RequestModel):
     codebase_path: str
     file_path: str
     edit_description: str
     api_key: str
 
-class ImportOperationRequest(BaseModel):
+class RefactorRequest(SemanticEditRequest):
+    dry_run: bool = False
+
+class ImportOperationRequest(RequestModel):
     codebase_path: str
     file_path: str
     import_source: str
     symbols: Optional[List[str]] = None
     api_key: str
 
-class DependencyRequest(BaseModel):
+class DependencyRequest(RequestModel):
     codebase_path: str
     symbol_name: str
     api_key: str
 
-class SearchRequest(BaseModel):
+class SearchRequest(RequestModel):
     codebase_path: str
     query: str
     api_key: str
 
-class JSXComponentRequest(BaseModel):
+class JSXComponentRequest(RequestModel):
     codebase_path: str
     component_name: str
     api_key: str
 
-class CallGraphRequest(BaseModel):
+class CallGraphRequest(RequestModel):
     codebase_path: str
     function_name: str
     api_key: str
 
-class ParameterOperationRequest(BaseModel):
+class ParameterOperationRequest(RequestModel):
     codebase_path: str
     function_name: str
     parameter_name: str
     parameter_type: Optional[str] = None
     api_key: str
 
-class ReturnTypeRequest(BaseModel):
+class ReturnTypeRequest(RequestModel):
     codebase_path: str
     function_name: str
     return_type: str
     api_key: str
 
-class DocGenerationRequest(BaseModel):
+class DocGenerationRequest(RequestModel):
     codebase_path: str
     symbol_name: str
     api_key: str
 
-class FormatCodeRequest(BaseModel):
+class FormatCodeRequest(RequestModel):
     codebase_path: str
     file_path: str
     api_key: str
 
 # Dependency
+# One service per API key, so parsed codebases are reused across requests
+@lru_cache(maxsize=128)
 def get_codegen_service(api_key: str) -> CodegenSDKService:
     return CodegenSDKService(api_key)
 
+# Codegen SDK calls block, so they run in worker threads. Calls on the
+# same codebase are serialized, since Codebase objects are not thread-safe
+SDK_THREAD_LIMIT = int(os.environ.get("SDK_THREAD_LIMIT", str(os.cpu_count() or 1)))
+sdk_limiter = anyio.CapacityLimiter(SDK_THREAD_LIMIT)
+codebase_locks: Dict[str, asyncio.Lock] = {}
+
+# CPU-bound analyses get their own, smaller limiter so they cannot take
+# every thread away from quick file and symbol operations. Analyses of the
+# same codebase are already serialized by its lock, so the limit only caps
+# how many codebases are analyzed at once. CPU_BOUND_THREAD_LIMIT defaults
+# to half the CPUs; lower it if analyses contend for the GIL
+CPU_BOUND_OPERATIONS = frozenset({
+    "analyze_codebase",
+    "find_dead_code",
+    "get_call_graph",
+})
+CPU_BOUND_THREAD_LIMIT = int(
+    os.environ.get("CPU_BOUND_THREAD_LIMIT", str(max(1, (os.cpu_count() or 1) // 2)))
+)
+cpu_bound_limiter = anyio.CapacityLimiter(CPU_BOUND_THREAD_LIMIT)
+
+# Service operations that change a codebase's files
+MUTATING_OPERATIONS = frozenset({
+    "edit_file",
+    "create_file",
+    "delete_file",
+    "rename_symbol",
+    "move_symbol",
+    "semantic_edit",
+    "add_import",
+    "extract_function",
+    "refactor_code",
+    "add_parameter",
+    "remove_parameter",
+    "change_return_type",
+    "remove_unused_imports",
+    "format_code",
+})
+
+# Bumped whenever a mutating operation runs on a codebase, so anything
+# derived from a codebase can tell whether it is still current
+codebase_versions: Dict[str, int] = {}
+
+# Read-only service operations whose results only depend on the codebase
+# and their arguments. Results are kept until the codebase changes through
+# this API. Each API key has its own service and parsed Codebase, with its
+# own unsaved edits, so results are kept per service. Files edited outside
+# the API are not picked up here, nor by the parsed Codebase itself
+CACHEABLE_OPERATIONS = frozenset({
+    "analyze_codebase",
+    "find_dead_code",
+    "get_dependencies",
+    "analyze_imports",
+    "analyze_jsx_component",
+    "get_call_graph",
+    "find_unused_imports",
+    "get_all_files",
+    "get_all_functions",
+    "get_all_classes",
+})
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", "256"))
+# (service, operation, codebase path, args, kwargs) -> (codebase version, result)
+result_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+def get_cached_result(key: tuple, codebase_path: str):
+    entry = result_cache.get(key)
+    if entry is None:
+        return None
+    version, result = entry
+    if version != codebase_versions.get(codebase_path, 0):
+        del result_cache[key]
+        return None
+    result_cache.move_to_end(key)
+    return result
+
+def cache_result(key: tuple, codebase_path: str, version: int, result):
+    # Skip results computed while another request changed the codebase
+    if version != codebase_versions.get(codebase_path, 0):
+        return
+    result_cache[key] = (version, result)
+    result_cache.move_to_end(key)
+    while len(result_cache) > RESULT_CACHE_SIZE:
+        result_cache.popitem(last=False)
+
+def invalidate_results(codebase_path: str):
+    for key in [key for key in result_cache if key[2] == codebase_path]:
+        del result_cache[key]
+
+async def run_sdk(func, codebase_path: str, *args, **kwargs):
+    """Run a blocking SDK call on a codebase in a worker thread."""
+    name = func.__name__
+    key = None
+    if name in CACHEABLE_OPERATIONS:
+        key = (getattr(func, "__self__", None), name, codebase_path, args, tuple(sorted(kwargs.items())))
+        result = get_cached_result(key, codebase_path)
+        if result is not None:
+            return result
+    lock = codebase_locks.setdefault(codebase_path, asyncio.Lock())
+    async with lock:
+        version = codebase_versions.get(codebase_path, 0)
+        try:
+            result = await anyio.to_thread.run_sync(
+                partial(func, codebase_path, *args, **kwargs),
+                limiter=cpu_bound_limiter if name in CPU_BOUND_OPERATIONS else sdk_limiter,
+            )
+        finally:
+            # A dry run only previews on a scratch copy
+            if name in MUTATING_OPERATIONS and not kwargs.get("dry_run"):
+                codebase_versions[codebase_path] = codebase_versions.get(codebase_path, 0) + 1
+                invalidate_results(codebase_path)
+    if key is not None:
+        cache_result(key, codebase_path, version, result)
+    return result
+
+# Lists are streamed as NDJSON, one item per line, when the client asks for it
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NDJSON_BATCH_SIZE = 256
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+async def ndjson_batches(iter_func, codebase_path: str) -> AsyncIterator[bytes]:
+    """
+    Pull items from a blocking SDK generator in worker threads and yield them
+    as NDJSON chunks. The codebase lock is taken for each batch and released
+    before it is yielded, so a slow client never holds up writes to the
+    codebase. The generator walks a list that edits replace rather than
+    modify, so it stays valid between batches. Always yields at least once,
+    so the first chunk can be awaited up front.
+    """
+    lock = codebase_locks.setdefault(codebase_path, asyncio.Lock())
+    items = iter_func(codebase_path)
+    yielded = False
+    while True:
+        async with lock:
+            batch = await anyio.to_thread.run_sync(
+                lambda: list(islice(items, NDJSON_BATCH_SIZE)), limiter=sdk_limiter
+            )
+        if not batch:
+            break
+        yielded = True
+        yield b"".join(orjson.dumps(item) + b"\n" for item in batch)
+    if not yielded:
+        yield b""
+
+async def stream_ndjson(iter_func, codebase_path: str) -> StreamingResponse:
+    """
+    Stream an SDK generator as NDJSON. The first batch is read before the
+    response starts, so parse errors still turn into a 500 with a detail.
+    """
+    batches = ndjson_batches(iter_func, codebase_path)
+    first = await batches.__anext__()
+
+    async def body():
+        yield first
+        async for chunk in batches:
+            yield chunk
+
+    return StreamingResponse(body(), media_type=NDJSON_MEDIA_TYPE)
+
 # Routes
-@app.post("/analyze")
-async def analyze_codebase(request: CodebaseRequest):
-    """Analyze a codebase."""
-    service = get_codegen_service(request.api_key)
-    try:
-        result = service.analyze_codebase(request.codebase_path)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/find-dead-code")
-async def find_dead_code(request: CodebaseRequest):
-    """Find dead code in a codebase."""
-    service = get_codegen_service(request.api_key)
-    try:
-        result = service.find_dead_code(request.codebase_path)
-        return {"dead_code": result}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/edit-file")
-async def edit_file(request: FileOperationRequest):
-    """Edit a file in the codebase."""
-    if not request.content:
-        raise HTTPException(status_code=400, detail="Content is required for edit operations")
-    
+class SDKRoute(NamedTuple):
+    """A POST route that calls one CodegenSDKService method."""
+    path: str
+    model: type
+    method: str
+    doc: str
+    # Request fields passed positionally after codebase_path
+    args: Tuple[str, ...] = ()
+    # Request fields passed as keyword arguments
+    kwargs: Tuple[str, ...] = ()
+    # Field that must be non-empty, and the 400 detail if it is not
+    required: Optional[Tuple[str, str]] = None
+
+SDK_ROUTES = [
+    SDKRoute("/analyze", AnalyzeRequest, "analyze_codebase", "Analyze a codebase.",
+             kwargs=("columnar",)),
+    SDKRoute("/find-dead-code", DeadCodeRequest, "find_dead_code", "Find dead code in a codebase.",
+             kwargs=("limit", "offset", "include_source")),
+    SDKRoute("/edit-file", FileOperationRequest, "edit_file", "Edit a file in the codebase.",
+             ("file_path", "content"), required=("content", "Content is required for edit operations")),
+    SDKRoute("/create-file", FileOperationRequest, "create_file", "Create a file in the codebase.",
+             ("file_path", "content"), required=("content", "Content is required for create operations")),
+    SDKRoute("/delete-file", FileOperationRequest, "delete_file", "Delete a file from the codebase.",
+             ("file_path",)),
+    SDKRoute("/get-symbol", SymbolOperationRequest, "get_symbol", "Get a symbol from the codebase.",
+             ("symbol_name",)),
+    SDKRoute("/rename-symbol", SymbolOperationRequest, "rename_symbol", "Rename a symbol in the codebase.",
+             ("symbol_name", "new_name"), required=("new_name", "New name is required for rename operations")),
+    SDKRoute("/move-symbol", SymbolOperationRequest, "move_symbol", "Move a symbol to another file.",
+             ("symbol_name", "target_file"), required=("target_file", "Target file is required for move operations")),
+    SDKRoute("/semantic-edit", SemanticEditRequest, "semantic_edit", "Perform a semantic edit on a file.",
+             ("file_path", "edit_description")),
+    SDKRoute("/get-dependencies", DependencyRequest, "get_dependencies", "Get dependencies of a symbol.",
+             ("symbol_name",)),
+    SDKRoute("/analyze-imports", FileOperationRequest, "analyze_imports", "Analyze imports in a file.",
+             ("file_path",)),
+    SDKRoute("/add-import", ImportOperationRequest, "add_import", "Add an import to a file.",
+             ("file_path", "import_source", "symbols")),
+    SDKRoute("/analyze-jsx-component", JSXComponentRequest, "analyze_jsx_component", "Analyze a JSX component.",
+             ("component_name",)),
+    SDKRoute("/get-call-graph", CallGraphRequest, "get_call_graph", "Get the call graph for a function.",
+             ("function_name",)),
+    SDKRoute("/search-code", SearchRequest, "search_code", "Search for code in the codebase.",
+             ("query",)),
+    SDKRoute("/semantic-search", SearchRequest, "semantic_search", "Perform a semantic search in the codebase.",
+             ("query",)),
+    SDKRoute("/get-file-content", FileOperationRequest, "get_file_content", "Get the content of a file.",
+             ("file_path",)),
+    SDKRoute("/extract-function", SemanticEditRequest, "extract_function", "Extract a function from a file.",
+             ("file_path", "edit_description")),
+    SDKRoute("/refactor-code", RefactorRequest, "refactor_code", "Refactor code in a file.",
+             ("file_path", "edit_description"), kwargs=("dry_run",)),
+    SDKRoute("/generate-documentation", DocGenerationRequest, "generate_documentation", "Generate documentation for a symbol.",
+             ("symbol_name",)),
+    SDKRoute("/add-parameter", ParameterOperationRequest, "add_parameter", "Add a parameter to a function.",
+             ("function_name", "parameter_name", "parameter_type")),
+    SDKRoute("/remove-parameter", ParameterOperationRequest, "remove_parameter", "Remove a parameter from a function.",
+             ("function_name", "parameter_name")),
+    SDKRoute("/change-return-type", ReturnTypeRequest, "change_return_type", "Change the return type of a function.",
+             ("function_name", "return_type")),
+    SDKRoute("/find-unused-imports", CodebaseRequest, "find_unused_imports", "Find unused imports in the codebase."),
+    SDKRoute("/remove-unused-imports", CodebaseRequest, "remove_unused_imports", "Remove unused imports from the codebase."),
+    SDKRoute("/format-code", FormatCodeRequest, "format_code", "Format code in a file.",
+             ("file_path",)),
+]
+
+def make_sdk_handler(route: SDKRoute):
+    """Build the handler for an SDKRoute. FastAPI reads the body model from its annotations."""
+    async def handler(request):
+        if route.required and not getattr(request, route.required[0]):
+            raise HTTPException(status_code=400, detail=route.required[1])
+        service = get_codegen_service(request.api_key)
+        return await run_sdk(
+            getattr(service, route.method),
+            request.codebase_path,
+            *[getattr(request, name) for name in route.args],
+            **{name: getattr(request, name) for name in route.kwargs},
+        )
+
+    handler.__name__ = handler.__qualname__ = route.method
+    handler.__doc__ = route.doc
+    handler.__annotations__ = {"request": route.model}
+    return handler
+
+def register_sdk_routes(sdk_routes: List[SDKRoute]):
+    for sdk_route in sdk_routes:
+        app.post(sdk_route.path)(make_sdk_handler(sdk_route))
+
+register_sdk_routes(SDK_ROUTES)
+
+# The list routes can also stream NDJSON, so they are written out
+@app.post("/get-all-files")
+async def get_all_files(request: CodebaseRequest, http_request: Request):
+    """Get all files in the codebase, as NDJSON if the client accepts it."""
     service = get_codegen_service(request.api_key)
-    try:
-        result = service.edit_file(request.codebase_path, request.file_path, request.content)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/create-file")
-async def create_file(request: FileOperationRequest):
-    """Create a file in the codebase."""
-    if not request.content:
-        raise HTTPException(status_code=400, detail="Content is required for create operations")
-    
+    if wants_ndjson(http_request):
+        return await stream_ndjson(service.iter_files, request.codebase_path)
+    result = await run_sdk(service.get_all_files, request.codebase_path)
+    return result
+
+@app.post("/get-all-functions")
+async def get_all_functions(request: CodebaseRequest, http_request: Request):
+    """Get all functions in the codebase, as NDJSON if the client accepts it."""
     service = get_codegen_service(request.api_key)
-    try:
-        result = service.create_file(request.codebase_path, request.file_path, request.content)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/delete-file")
-async def delete_file(request: FileOperationRequest):
-    """Delete a file from the codebase."""
+    if wants_ndjson(http_request):
+        return await stream_ndjson(service.iter_functions, request.codebase_path)
+    result = await run_sdk(service.get_all_functions, request.codebase_path)
+    return result
+
+@app.post("/get-all-classes")
+async def get_all_classes(request: CodebaseRequest, http_request: Request):
+    """Get all classes in the codebase, as NDJSON if the client accepts it."""
     service = get_codegen_service(request.api_key)
-    try:
-        result = service.delete_file(request.codebase_path, request.file_path)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/get-symbol")
-async def get_symbol(request: SymbolOperationRequest):
+    if wants_ndjson(http_request):
+        return await stream_ndjson(service.iter_classes, request.codebase_path)
+    result = await run_sdk(service.get_all_classes, request.codebase_path)
+    return result
+
+# Read-only GET routes. These take the API key in an X-API-Key header so it
+# stays out of URLs and logs, and answer with an ETag over the response body,
+# so a client re-polling unchanged results gets an empty 304. The body itself
+# usually comes from the result cache, so a repeat poll does no SDK work
+def etag_response(http_request: Request, content: Any) -> Response:
+    body = CodeHubJSONResponse(content).body
+    etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = http_request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+@app.get("/analyze")
+async def analyze_codebase_get(http_request: Request, codebase_path: str, columnar: bool = False, api_key: str = Header(alias="X-API-Key")):
+    """Analyze a codebase."""
+    service = get_codegen_service(api_key)
+    result = await run_sdk(service.analyze_codebase, normalize_path(codebase_path), columnar=columnar)
+    return etag_response(http_request, result)
+
+@app.get("/get-symbol")
+async def get_symbol_get(http_request: Request, codebase_path: str, symbol_name: str, api_key: str = Header(alias="X-API-Key")):
     """Get a symbol from the codebase."""
-    service = get_codegen_service(request.api_key)
-    try:
-        result = service.get_symbol(request.codebase_path, request.symbol_name)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/rename-symbol")
-async def rename_symbol(request: SymbolOperationRequest):
-    """Rename a symbol in the codebase."""
-    if not request.new_name:
-        raise HTTPException(status_code=400, detail="New name is required for rename operations")
-    
-    service = get_codegen_service(request.api_key)
-    try:
-        result = service.rename_symbol(request.codebase_path, request.symbol_name, request.new_name)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/move-symbol")
-async def move_symbol(request: SymbolOperationRequest):
-    """Move a symbol to another file."""
-    if not request.target_file:
-        raise HTTPException(status_code=400, detail="Target file is required for move operations")
-    
-    service = get_codegen_service(request.api_key)
-    try:
-        result = service.move_symbol(request.codebase_path, request.symbol_name, request.target_file)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/semantic-edit")
-async def semantic_edit(request: SemanticEditRequest):
-    """Perform a semantic edit on a file."""
-    service = get_codegen_service(request.api_key)
-    try:
-        result = service.semantic_edit(request.codebase_path, request.file_path, request.edit_description)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/get-dependencies")
-async def get_dependencies(request: DependencyRequest):
-    """Get dependencies of a symbol."""
-    service = get_codegen_service(request.api_key)
-    try:
-        result = service.get_dependencies(request.codebase_path, request.symbol_name)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/analyze-imports")
-async def analyze_imports(request: FileOperationRequest):
-    """Analyze imports in a file."""
-    service = get_codegen_service(request.api_key)
-    try:
-        result = service.analyze_imports(request.codebase_path, request.file_path)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/add-import")
-async def add_import(request: ImportOperationRequest):
-    """Add an import to a file."""
-    service = get_codegen_service(request.api_key)
-    try:
-        result = service.add_import(request.codebase_path, request.file_path, request.import_source, request.symbols)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/analyze-jsx-component")
-async def analyze_jsx_component(request: JSXComponentRequest):
-    """Analyze a JSX component."""
-    service = get_codegen_service(request.api_key)
-    try:
-        result = service.analyze_jsx_component(request.codebase_path, request.component_name)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/get-call-graph")
-async def get_call_graph(request: CallGraphRequest):
+    service = get_codegen_service(api_key)
+    result = await run_sdk(service.get_symbol, normalize_path(codebase_path), symbol_name)
+    return etag_response(http_request, result)
+
+@app.get("/get-call-graph")
+async def get_call_graph_get(http_request: Request, codebase_path: str, function_name: str, api_key: str = Header(alias="X-API-Key")):
     """Get the call graph for a function."""
-    service = get_codegen_service(request.api_key)
-    try:
-        result = service.get_call_graph(request.codebase_path, request.function_name)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/search-code")
-async def search_code(request: SearchRequest):
-    """Search for code in the codebase."""
-    service = get_codegen_service(request.api_key)
-    try:
-        result = service.search_code(request.codebase_path, request.query)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/semantic-search")
-async def semantic_search(request: SearchRequest):
-    """Perform a semantic search in the codebase."""
-    service = get_codegen_service(request.api_key)
-    try:
-        result = service.semantic_search(request.codebase_path, request.query)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    service = get_codegen_service(api_key)
+    result = await run_sdk(service.get_call_graph, normalize_path(codebase_path), function_name)
+    return etag_response(http_request, result)
 
-@app.post("/get-all-files")
-async def get_all_files(request: CodebaseRequest):
+@app.get("/get-file-content")
+async def get_file_content_get(http_request: Request, codebase_path: str, file_path: str, api_key: str = Header(alias="X-API-Key")):
+    """Get the content of a file."""
+    service = get_codegen_service(api_key)
+    result = await run_sdk(service.get_file_content, normalize_path(codebase_path), file_path)
+    return etag_response(http_request, result)
+
+@app.get("/get-all-files")
+async def get_all_files_get(http_request: Request, codebase_path: str, api_key: str = Header(alias="X-API-Key")):
     """Get all files in the codebase."""
-    service = get_codegen_service(request.api_key)
-    try:
-        result = service.get_all_files(request.codebase_path)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    service = get_codegen_service(api_key)
+    result = await run_sdk(service.get_all_files, normalize_path(codebase_path))
+    return etag_response(http_request, result)
 
-@app.post("/get-all-functions")
-async def get_all_functions(request: CodebaseRequest):
+@app.get("/get-all-functions")
+async def get_all_functions_get(http_request: Request, codebase_path: str, api_key: str = Header(alias="X-API-Key")):
     """Get all functions in the codebase."""
-    service = get_codegen_service(request.api_key)
-    try:
-        result = service.get_all_functions(request.codebase_path)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    service = get_codegen_service(api_key)
+    result = await run_sdk(service.get_all_functions, normalize_path(codebase_path))
+    return etag_response(http_request, result)
 
-@app.post("/get-all-classes")
-async def get_all_classes(request: CodebaseRequest):
+@app.get("/get-all-classes")
+async def get_all_classes_get(http_request: Request, codebase_path: str, api_key: str = Header(alias="X-API-Key")):
     """Get all classes in the codebase."""
-    service = get_codegen_service(request.api_key)
-    try:
-        result = service.get_all_classes(request.codebase_path)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/get-file-content")
-async def get_file_content(request: FileOperationRequest):
-    """Get the content of a file."""
-    service = get_codegen_service(request.api_key)
-    try:
-        result = service.get_file_content(request.codebase_path, request.file_path)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/extract-function")
-async def extract_function(request: SemanticEditRequest):
-    """Extract a function from a file."""
-    service = get_codegen_service(request.api_key)
-    try:
-        result = service.extract_function(request.codebase_path, request.file_path, request.edit_description)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/refactor-code")
-async def refactor_code(request: SemanticEditRequest):
-    """Refactor code in a file."""
-    service = get_codegen_service(request.api_key)
-    try:
-        result = service.refactor_code(request.codebase_path, request.file_path, request.edit_description)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/generate-documentation")
-async def generate_documentation(request: DocGenerationRequest):
-    """Generate documentation for a symbol."""
-    service = get_codegen_service(request.api_key)
-    try:
-        result = service.generate_documentation(request.codebase_path, request.symbol_name)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/add-parameter")
-async def add_parameter(request: ParameterOperationRequest):
-    """Add a parameter to a function."""
-    service = get_codegen_service(request.api_key)
-    try:
-        result = service.add_parameter(request.codebase_path, request.function_name, request.parameter_name, request.parameter_type)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/remove-parameter")
-async def remove_parameter(request: ParameterOperationRequest):
-    """Remove a parameter from a function."""
-    service = get_codegen_service(request.api_key)
-    try:
-        result = service.remove_parameter(request.codebase_path, request.function_name, request.parameter_name)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/change-return-type")
-async def change_return_type(request: ReturnTypeRequest):
-    """Change the return type of a function."""
-    service = get_codegen_service(request.api_key)
-    try:
-        result = service.change_return_type(request.codebase_path, request.function_name, request.return_type)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/find-unused-imports")
-async def find_unused_imports(request: CodebaseRequest):
-    """Find unused imports in the codebase."""
-    service = get_codegen_service(request.api_key)
-    try:
-        result = service.find_unused_imports(request.codebase_path)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/remove-unused-imports")
-async def remove_unused_imports(request: CodebaseRequest):
-    """Remove unused imports from the codebase."""
-    service = get_codegen_service(request.api_key)
-    try:
-        result = service.remove_unused_imports(request.codebase_path)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/format-code")
-async def format_code(request: FormatCodeRequest):
-    """Format code in a file."""
-    service = get_codegen_service(request.api_key)
-    try:
-        result = service.format_code(request.codebase_path, request.file_path)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    service = get_codegen_service(api_key)
+    result = await run_sdk(service.get_all_classes, normalize_path(codebase_path))
+    return etag_response(http_request, result)
 
 # Chat models
-class ChatRequest(BaseModel):
+class ChatRequest(RequestModel):
     codebase_path: str
     message: str
     api_key: str
@@ -411,19 +538,64 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     content: str
 
+# Chat agents index the codebase when created, so they are kept per
+# (codebase path, API key) and rebuilt only when the codebase changes
+CHAT_AGENT_CACHE_SIZE = int(os.environ.get("CHAT_AGENT_CACHE_SIZE", "32"))
+# (codebase path, API key) -> (codebase version, agent)
+chat_agents: "OrderedDict[tuple, tuple]" = OrderedDict()
+# Chats on different codebases run in worker threads at the same time
+chat_agents_lock = threading.Lock()
+
+def get_chat_agent(codebase_path: str, api_key: str):
+    key = (codebase_path, api_key)
+    version = codebase_versions.get(codebase_path, 0)
+    with chat_agents_lock:
+        entry = chat_agents.get(key)
+        if entry is not None and entry[0] == version:
+            chat_agents.move_to_end(key)
+            return entry[1]
+    
+    # Reuse the codebase parsed for this key's other operations
+    codebase = get_codegen_service(api_key).get_or_create_codebase(codebase_path)
+    
+    from codegen.chat import ChatAgent
+    agent = ChatAgent(codebase, api_key=api_key)
+    with chat_agents_lock:
+        chat_agents[key] = (version, agent)
+        chat_agents.move_to_end(key)
+        while len(chat_agents) > CHAT_AGENT_CACHE_SIZE:
+            chat_agents.popitem(last=False)
+    return agent
+
+def process_chat_message(codebase_path: str, message: str, api_key: str):
+    # Runs under the codebase lock, so the agent is never used concurrently
+    agent = get_chat_agent(codebase_path, api_key)
+    
+    # Process the message
+    return agent.process_message(message)
+
 @app.post("/chat")
 async def chat(request: ChatRequest):
     """Process a chat message using the Codegen SDK."""
-    try:
-        codebase = Codebase(request.codebase_path)
-        
-        # Create a chat agent with the codebase
-        from codegen.chat import ChatAgent
-        agent = ChatAgent(codebase, api_key=request.api_key)
-        
-        # Process the message
-        response = agent.process_message(request.message)
-        
-        return ChatResponse(content=response.content)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    response = await run_sdk(process_chat_message, request.codebase_path, request.message, request.api_key)
+    
+    return ChatResponse(content=response.content)
+
+# Run with `python -m backend.app` from the codebaseQA directory.
+# This runs a single worker on purpose. Parsed codebases, locks, version
+# counters and result caches live in this process, and edits through the
+# API update the parsed Codebase in place. A second worker would keep
+# serving its own stale parse after the first one edits the same files.
+# CPU-bound analyses are bounded by CPU_BOUND_THREAD_LIMIT instead
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(
+        f"{__package__}.app:app",
+        host="0.0.0.0",
+        port=int(os.environ.get("PORT", "8000")),
+        workers=1,
+        # uvloop does not support Windows
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+    )
@@ -3,9 +3,14 @@ Service for interacting with the Codegen SDK.
 This service provides functions to analyze and modify codebases using the Codegen SDK.
 """
 
+import difflib
 import os
-import json
-from typing import Dict, List, Optional, Any, Union
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Iterator, List, Any, Optional
 
 # Import the Codegen SDK
 from codegen import Codebase
@@ -21,428 +26,34 @@ from codegen.refactoring import extract_function, refactor_code
 from codegen.documentation import generate_documentation
 from codegen.imports import find_unused_imports, remove_unused_imports
 from codegen.formatting import format_code
-from fastapi import FastAPI
-from pydantic import BaseModel
-from typing import Dict, List, Tuple, Any
-from codegen import Codebase
-from codegen.sdk.core.statements.for_loop_statement import ForLoopStatement
-from codegen.sdk.core.statements.if_block_statement import IfBlockStatement
-from codegen.sdk.core.statements.try_catch_statement import TryCatchStatement
-from codegen.sdk.core.statements.while_statement import WhileStatement
-from codegen.sdk.core.expressions.binary_expression import BinaryExpression
-from codegen.sdk.core.expressions.unary_expression import UnaryExpression
-from codegen.sdk.core.expressions.comparison_expression import ComparisonExpression
-import math
-import re
-import requests
-from datetime import datetime, timedelta
-import subprocess
-import os
-import tempfile
-from fastapi.middleware.cors import CORSMiddleware
-import modal
-
-image = (
-    modal.Image.debian_slim()
-    .apt_install("git")
-    .pip_install(
-        "codegen", "fastapi", "uvicorn", "gitpython", "requests", "pydantic", "datetime"
-    )
-)
-
-app = modal.App(name="analytics-app", image=image)
 
-fastapi_app = FastAPI()
 
-fastapi_app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+# stat() releases the GIL, so file sizes for a whole codebase are looked up
+# in parallel. SDK objects themselves are only touched on the calling thread
+stat_pool = ThreadPoolExecutor(
+    max_workers=min(32, (os.cpu_count() or 1) * 4), thread_name_prefix="codehub-stat"
 )
 
 
-def get_monthly_commits(repo_path: str) -> Dict[str, int]:
-    """
-    Get the number of commits per month for the last 12 months.
-
-    Args:
-        repo_path: Path to the git repository
-
-    Returns:
-        Dictionary with month-year as key and number of commits as value
-    """
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=365)
-
-    date_format = "%Y-%m-%d"
-    since_date = start_date.strftime(date_format)
-    until_date = end_date.strftime(date_format)
-    repo_path = "https://github.com/" + repo_path
-
-    try:
-        original_dir = os.getcwd()
-
-        with tempfile.TemporaryDirectory() as temp_dir:
-            subprocess.run(["git", "clone", repo_path, temp_dir], check=True)
-            os.chdir(temp_dir)
-
-            cmd = [
-                "git",
-                "log",
-                f"--since={since_date}",
-                f"--until={until_date}",
-                "--format=%aI",
-            ]
-
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            commit_dates = result.stdout.strip().split("\n")
-
-            monthly_counts = {}
-            current_date = start_date
-            while current_date <= end_date:
-                month_key = current_date.strftime("%Y-%m")
-                monthly_counts[month_key] = 0
-                current_date = (
-                    current_date.replace(day=1) + timedelta(days=32)
-                ).replace(day=1)
-
-            for date_str in commit_dates:
-                if date_str:  # Skip empty lines
-                    commit_date = datetime.fromisoformat(date_str.strip())
-                    month_key = commit_date.strftime("%Y-%m")
-                    if month_key in monthly_counts:
-                        monthly_counts[month_key] += 1
-
-            os.chdir(original_dir)
-            return dict(sorted(monthly_counts.items()))
-
-    except subprocess.CalledProcessError as e:
-        print(f"Error executing git command: {e}")
-        return {}
-    except Exception as e:
-        print(f"Error processing git commits: {e}")
-        return {}
-    finally:
-        try:
-            os.chdir(original_dir)
-        except:
-            pass
-
-
-def calculate_cyclomatic_complexity(function):
-    def analyze_statement(statement):
-        complexity = 0
-
-        if isinstance(statement, IfBlockStatement):
-            complexity += 1
-            if hasattr(statement, "elif_statements"):
-                complexity += len(statement.elif_statements)
-
-        elif isinstance(statement, (ForLoopStatement, WhileStatement)):
-            complexity += 1
-
-        elif isinstance(statement, TryCatchStatement):
-            complexity += len(getattr(statement, "except_blocks", []))
-
-        if hasattr(statement, "condition") and isinstance(statement.condition, str):
-            complexity += statement.condition.count(
-                " and "
-            ) + statement.condition.count(" or ")
-
-        if hasattr(statement, "nested_code_blocks"):
-            for block in statement.nested_code_blocks:
-                complexity += analyze_block(block)
-
-        return complexity
-
-    def analyze_block(block):
-        if not block or not hasattr(block, "statements"):
-            return 0
-        return sum(analyze_statement(stmt) for stmt in block.statements)
-
-    return (
-        1 + analyze_block(function.code_block) if hasattr(function, "code_block") else 1
-    )
-
-
-def cc_rank(complexity):
-    if complexity < 0:
-        raise ValueError("Complexity must be a non-negative value")
-
-    ranks = [
-        (1, 5, "A"),
-        (6, 10, "B"),
-        (11, 20, "C"),
-        (21, 30, "D"),
-        (31, 40, "E"),
-        (41, float("inf"), "F"),
-    ]
-    for low, high, rank in ranks:
-        if low <= complexity <= high:
-            return rank
-    return "F"
-
-
-def calculate_doi(cls):
-    """Calculate the depth of inheritance for a given class."""
-    return len(cls.superclasses)
-
-
-def get_operators_and_operands(function):
-    operators = []
-    operands = []
-
-    for statement in function.code_block.statements:
-        for call in statement.function_calls:
-            operators.append(call.name)
-            for arg in call.args:
-                operands.append(arg.source)
-
-        if hasattr(statement, "expressions"):
-            for expr in statement.expressions:
-                if isinstance(expr, BinaryExpression):
-                    operators.extend([op.source for op in expr.operators])
-                    operands.extend([elem.source for elem in expr.elements])
-                elif isinstance(expr, UnaryExpression):
-                    operators.append(expr.ts_node.type)
-                    operands.append(expr.argument.source)
-                elif isinstance(expr, ComparisonExpression):
-                    operators.extend([op.source for op in expr.operators])
-                    operands.extend([elem.source for elem in expr.elements])
-
-        if hasattr(statement, "expression"):
-            expr = statement.expression
-            if isinstance(expr, BinaryExpression):
-                operators.extend([op.source for op in expr.operators])
-                operands.extend([elem.source for elem in expr.elements])
-            elif isinstance(expr, UnaryExpression):
-                operators.append(expr.ts_node.type)
-                operands.append(expr.argument.source)
-            elif isinstance(expr, ComparisonExpression):
-                operators.extend([op.source for op in expr.operators])
-                operands.extend([elem.source for elem in expr.elements])
-
-    return operators, operands
-
-
-def calculate_halstead_volume(operators, operands):
-    n1 = len(set(operators))
-    n2 = len(set(operands))
-
-    N1 = len(operators)
-    N2 = len(operands)
-
-    N = N1 + N2
-    n = n1 + n2
-
-    if n > 0:
-        volume = N * math.log2(n)
-        return volume, N1, N2, n1, n2
-    return 0, N1, N2, n1, n2
-
-
-def count_lines(source: str):
-    """Count different types of lines in source code."""
-    if not source.strip():
-        return 0, 0, 0, 0
-
-    lines = [line.strip() for line in source.splitlines()]
-    loc = len(lines)
-    sloc = len([line for line in lines if line])
-
-    in_multiline = False
-    comments = 0
-    code_lines = []
-
-    i = 0
-    while i < len(lines):
-        line = lines[i]
-        code_part = line
-        if not in_multiline and "#" in line:
-            comment_start = line.find("#")
-            if not re.search(r'["\'].*#.*["\']', line[:comment_start]):
-                code_part = line[:comment_start].strip()
-                if line[comment_start:].strip():
-                    comments += 1
-
-        if ('"""' in line or "'''" in line) and not (
-            line.count('"""') % 2 == 0 or line.count("'''") % 2 == 0
-        ):
-            if in_multiline:
-                in_multiline = False
-                comments += 1
-            else:
-                in_multiline = True
-                comments += 1
-                if line.strip().startswith('"""') or line.strip().startswith("'''"):
-                    code_part = ""
-        elif in_multiline:
-            comments += 1
-            code_part = ""
-        elif line.strip().startswith("#"):
-            comments += 1
-            code_part = ""
-
-        if code_part.strip():
-            code_lines.append(code_part)
-
-        i += 1
-
-    lloc = 0
-    continued_line = False
-    for line in code_lines:
-        if continued_line:
-            if not any(line.rstrip().endswith(c) for c in ("\\", ",", "{", "[", "(")):
-                continued_line = False
-            continue
-
-        lloc += len([stmt for stmt in line.split(";") if stmt.strip()])
-
-        if any(line.rstrip().endswith(c) for c in ("\\", ",", "{", "[", "(")):
-            continued_line = True
-
-    return loc, lloc, sloc, comments
-
-
-def calculate_maintainability_index(
-    halstead_volume: float, cyclomatic_complexity: float, loc: int
-) -> int:
-    """Calculate the normalized maintainability index for a given function."""
-    if loc <= 0:
-        return 100
-
+def file_size(path: str) -> int:
+    """Get the size of a file in bytes, or 0 if it does not exist."""
     try:
-        raw_mi = (
-            171
-            - 5.2 * math.log(max(1, halstead_volume))
-            - 0.23 * cyclomatic_complexity
-            - 16.2 * math.log(max(1, loc))
-        )
-        normalized_mi = max(0, min(100, raw_mi * 100 / 171))
-        return int(normalized_mi)
-    except (ValueError, TypeError):
+        return os.stat(path).st_size
+    except OSError:
         return 0
 
 
-def get_maintainability_rank(mi_score: float) -> str:
-    """Convert maintainability index score to a letter grade."""
-    if mi_score >= 85:
-        return "A"
-    elif mi_score >= 65:
-        return "B"
-    elif mi_score >= 45:
-        return "C"
-    elif mi_score >= 25:
-        return "D"
-    else:
-        return "F"
-
-
-def get_github_repo_description(repo_url):
-    api_url = f"https://api.github.com/repos/{repo_url}"
-
-    response = requests.get(api_url)
-
-    if response.status_code == 200:
-        repo_data = response.json()
-        return repo_data.get("description", "No description available")
-    else:
-        return ""
-
-
-class RepoRequest(BaseModel):
-    repo_url: str
-
-
-@fastapi_app.post("/analyze_repo")
-async def analyze_repo(request: RepoRequest) -> Dict[str, Any]:
-    """Analyze a repository and return comprehensive metrics."""
-    repo_url = request.repo_url
-    codebase = Codebase.from_repo(repo_url)
-
-    num_files = len(codebase.files(extensions="*"))
-    num_functions = len(codebase.functions)
-    num_classes = len(codebase.classes)
-
-    total_loc = total_lloc = total_sloc = total_comments = 0
-    total_complexity = 0
-    total_volume = 0
-    total_mi = 0
-    total_doi = 0
-
-    monthly_commits = get_monthly_commits(repo_url)
-    print(monthly_commits)
-
-    for file in codebase.files:
-        loc, lloc, sloc, comments = count_lines(file.source)
-        total_loc += loc
-        total_lloc += lloc
-        total_sloc += sloc
-        total_comments += comments
-
-    callables = codebase.functions + [m for c in codebase.classes for m in c.methods]
-
-    num_callables = 0
-    for func in callables:
-        if not hasattr(func, "code_block"):
-            continue
-
-        complexity = calculate_cyclomatic_complexity(func)
-        operators, operands = get_operators_and_operands(func)
-        volume, _, _, _, _ = calculate_halstead_volume(operators, operands)
-        loc = len(func.code_block.source.splitlines())
-        mi_score = calculate_maintainability_index(volume, complexity, loc)
-
-        total_complexity += complexity
-        total_volume += volume
-        total_mi += mi_score
-        num_callables += 1
-
-    for cls in codebase.classes:
-        doi = calculate_doi(cls)
-        total_doi += doi
-
-    desc = get_github_repo_description(repo_url)
-
-    results = {
-        "repo_url": repo_url,
-        "line_metrics": {
-            "total": {
-                "loc": total_loc,
-                "lloc": total_lloc,
-                "sloc": total_sloc,
-                "comments": total_comments,
-                "comment_density": (total_comments / total_loc * 100)
-                if total_loc > 0
-                else 0,
-            },
-        },
-        "cyclomatic_complexity": {
-            "average": total_complexity if num_callables > 0 else 0,
-        },
-        "depth_of_inheritance": {
-            "average": total_doi / len(codebase.classes) if codebase.classes else 0,
-        },
-        "halstead_metrics": {
-            "total_volume": int(total_volume),
-            "average_volume": int(total_volume / num_callables)
-            if num_callables > 0
-            else 0,
-        },
-        "maintainability_index": {
-            "average": int(total_mi / num_callables) if num_callables > 0 else 0,
-        },
-        "description": desc,
-        "num_files": num_files,
-        "num_functions": num_functions,
-        "num_classes": num_classes,
-        "monthly_commits": monthly_commits,
-    }
+# Directories a refactoring preview does not need in its scratch copy
+PREVIEW_IGNORE = shutil.ignore_patterns(
+    ".git", ".hg", ".svn", "node_modules", "__pycache__", ".venv", "venv",
+    ".tox", ".mypy_cache", ".pytest_cache", ".next", "dist", "build",
+)
 
-    return results
 
+@lru_cache(maxsize=1024)
+def normalize_path(path: str) -> str:
+    """Resolve symlinks, "..", trailing slashes and (on Windows) case in a codebase path."""
+    return os.path.normcase(os.path.realpath(path))
 
 
 class CodegenSDKService:
@@ -456,6 +67,7 @@ class CodegenSDKService:
         """
         self.api_key = api_key
         self.active_codebases = {}  # Map of codebase paths to Codebase objects
+        self.indexes = {}  # Map of codebase paths to materialized files/functions/classes and memos
     
     def get_or_create_codebase(self, codebase_path: str) -> Codebase:
         """Get or create a Codebase object for the given path.
@@ -466,90 +78,155 @@ class CodegenSDKService:
         Returns:
             A Codebase object
         """
-        if codebase_path not in self.active_codebases:
+        # Spellings of the same directory share one parsed Codebase
+        key = normalize_path(codebase_path)
+        if key not in self.active_codebases:
             # Create a new Codebase object
-            self.active_codebases[codebase_path] = Codebase(codebase_path)
+            self.active_codebases[key] = Codebase(key)
+        
+        return self.active_codebases[key]
+    
+    def get_index(self, codebase_path: str, kind: str) -> List[Any]:
+        """Get a codebase's files, functions or classes as a list.
+        
+        The SDK walks the graph each time these properties are read, so the
+        list is built once and kept until a method edits the codebase.
+        
+        Args:
+            codebase_path: Path to the codebase
+            kind: "files", "functions" or "classes"
+            
+        Returns:
+            The materialized list
+        """
+        index = self.indexes.setdefault(normalize_path(codebase_path), {})
+        if kind not in index:
+            index[kind] = list(getattr(self.get_or_create_codebase(codebase_path), kind))
+        return index[kind]
+    
+    def get_memo(self, codebase_path: str, kind: str) -> Dict[str, Any]:
+        """Get a per-codebase memo of per-symbol results, cleared with the index.
         
-        return self.active_codebases[codebase_path]
+        Args:
+            codebase_path: Path to the codebase
+            kind: Name of the memo, e.g. "usages"
+            
+        Returns:
+            A dict to store results in by symbol name
+        """
+        return self.indexes.setdefault(normalize_path(codebase_path), {}).setdefault(kind, {})
+    
+    def invalidate_index(self, codebase_path: str):
+        """Drop the lists built by get_index for a codebase that is being edited."""
+        self.indexes.pop(normalize_path(codebase_path), None)
     
-    def analyze_codebase(self, codebase_path: str) -> Dict[str, Any]:
+    def analyze_codebase(self, codebase_path: str, columnar: bool = False) -> Dict[str, Any]:
         """Analyze a codebase.
         
         Args:
             codebase_path: Path to the codebase
+            columnar: Return files, functions and classes as one list per
+                field instead of one dict per item
             
         Returns:
             Analysis results
         """
         codebase = self.get_or_create_codebase(codebase_path)
         
-        # Get all files in the codebase
-        files = []
-        for file in codebase.files:
-            file_info = {
-                "path": file.path,
-                "type": "file",
-                "size": os.path.getsize(file.path) if os.path.exists(file.path) else 0
-            }
-            files.append(file_info)
+        # Get all files in the codebase. Paths are interned since every
+        # function and class in a file repeats its path
+        file_paths = [sys.intern(file.path) for file in self.get_index(codebase_path, "files")]
+        file_sizes = list(stat_pool.map(file_size, file_paths))
         
         # Get all functions in the codebase
-        functions = []
-        for function in codebase.functions:
-            function_info = {
-                "name": function.name,
-                "file": function.file.path,
-                "line_count": len(function.source.splitlines()) if function.source else 0,
-                "parameters": [param.name for param in function.parameters] if hasattr(function, "parameters") else []
-            }
-            functions.append(function_info)
+        function_names, function_files, function_line_counts, function_parameters = [], [], [], []
+        for function in self.get_index(codebase_path, "functions"):
+            function_names.append(function.name)
+            function_files.append(sys.intern(function.file.path))
+            function_line_counts.append(len(function.source.splitlines()) if function.source else 0)
+            function_parameters.append([param.name for param in getattr(function, "parameters", ())])
         
         # Get all classes in the codebase
-        classes = []
-        for cls in codebase.classes:
-            class_info = {
-                "name": cls.name,
-                "file": cls.file.path,
-                "method_count": len([m for m in cls.methods]) if hasattr(cls, "methods") else 0
-            }
-            classes.append(class_info)
+        class_names, class_files, class_method_counts = [], [], []
+        for cls in self.get_index(codebase_path, "classes"):
+            class_names.append(cls.name)
+            class_files.append(sys.intern(cls.file.path))
+            class_method_counts.append(len(list(getattr(cls, "methods", ()))))
         
         # Get codebase structure
         structure = get_codebase_structure(codebase)
         
+        if columnar:
+            return {
+                "files": {"path": file_paths, "size": file_sizes},
+                "functions": {
+                    "name": function_names,
+                    "file": function_files,
+                    "line_count": function_line_counts,
+                    "parameters": function_parameters
+                },
+                "classes": {"name": class_names, "file": class_files, "method_count": class_method_counts},
+                "structure": structure
+            }
+        
         return {
-            "files": files,
-            "functions": functions,
-            "classes": classes,
+            "files": [
+                {"path": path, "type": "file", "size": size}
+                for path, size in zip(file_paths, file_sizes)
+            ],
+            "functions": [
+                {"name": name, "file": file, "line_count": line_count, "parameters": parameters}
+                for name, file, line_count, parameters in zip(
+                    function_names, function_files, function_line_counts, function_parameters
+                )
+            ],
+            "classes": [
+                {"name": name, "file": file, "method_count": method_count}
+                for name, file, method_count in zip(class_names, class_files, class_method_counts)
+            ],
             "structure": structure
         }
     
-    def find_dead_code(self, codebase_path: str) -> List[Dict[str, Any]]:
+    def find_dead_code(
+        self,
+        codebase_path: str,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        include_source: bool = True,
+    ) -> Dict[str, Any]:
         """Find dead code in a codebase.
         
         Args:
             codebase_path: Path to the codebase
+            limit: Maximum number of functions to return, or None for all
+            offset: Number of functions to skip
+            include_source: Whether to include each function's source
             
         Returns:
-            List of dead code functions
+            A page of dead code functions and the total number found
         """
         codebase = self.get_or_create_codebase(codebase_path)
         
         # Find dead code using the Codegen SDK
-        dead_functions = find_dead_code(codebase)
+        dead_functions = list(find_dead_code(codebase))
+        end = None if limit is None else offset + limit
         
-        # Format the results
+        # Format only the requested page
         results = []
-        for function in dead_functions:
+        for function in dead_functions[offset:end]:
             result = {
                 "name": function.name,
                 "file": function.file.path,
-                "line": function.start_line,
-                "source": function.source
+                "line": function.start_line
             }
+            if include_source:
+                result["source"] = function.source
             results.append(result)
         
-        return results
+        return {
+            "dead_code": results,
+            "total_count": len(dead_functions)
+        }
     
     def edit_file(self, codebase_path: str, file_path: str, content: str) -> Dict[str, Any]:
         """Edit a file in the codebase.
@@ -563,6 +240,7 @@ class CodegenSDKService:
             Result of the operation
         """
         codebase = self.get_or_create_codebase(codebase_path)
+        self.invalidate_index(codebase_path)
         
         # Get the file from the codebase
         file = codebase.get_file(file_path)
@@ -589,6 +267,7 @@ class CodegenSDKService:
             Result of the operation
         """
         codebase = self.get_or_create_codebase(codebase_path)
+        self.invalidate_index(codebase_path)
         
         # Create the file
         new_file = create_file(codebase, file_path, content)
@@ -611,6 +290,7 @@ class CodegenSDKService:
             Result of the operation
         """
         codebase = self.get_or_create_codebase(codebase_path)
+        self.invalidate_index(codebase_path)
         
         # Delete the file
         delete_file(codebase, file_path)
@@ -637,17 +317,14 @@ class CodegenSDKService:
         # Get the symbol
         symbol = codebase.get_symbol(symbol_name)
         
-        # Get usages of the symbol
-        usages = get_usages(symbol)
-        
-        # Format usages
-        formatted_usages = []
-        for usage in usages:
-            formatted_usage = {
-                "file": usage.file.path,
-                "line": usage.line
-            }
-            formatted_usages.append(formatted_usage)
+        # Get usages of the symbol, walking the graph once per codebase edit
+        usages = self.get_memo(codebase_path, "usages")
+        if symbol_name not in usages:
+            usages[symbol_name] = [
+                {"file": usage.file.path, "line": usage.line}
+                for usage in get_usages(symbol)
+            ]
+        formatted_usages = usages[symbol_name]
         
         return {
             "name": symbol.name,
@@ -670,6 +347,7 @@ class CodegenSDKService:
             Result of the operation
         """
         codebase = self.get_or_create_codebase(codebase_path)
+        self.invalidate_index(codebase_path)
         
         # Get the symbol
         symbol = codebase.get_symbol(symbol_name)
@@ -697,6 +375,7 @@ class CodegenSDKService:
             Result of the operation
         """
         codebase = self.get_or_create_codebase(codebase_path)
+        self.invalidate_index(codebase_path)
         
         # Get the symbol
         symbol = codebase.get_symbol(symbol_name)
@@ -727,6 +406,7 @@ class CodegenSDKService:
             Result of the operation
         """
         codebase = self.get_or_create_codebase(codebase_path)
+        self.invalidate_index(codebase_path)
         
         # Get the file
         file = codebase.get_file(file_path)
@@ -755,23 +435,19 @@ class CodegenSDKService:
         Returns:
             Dependencies information
         """
-        codebase = self.get_or_create_codebase(codebase_path)
-        
-        # Get the symbol
-        symbol = codebase.get_symbol(symbol_name)
-        
-        # Get dependencies
-        dependencies = get_dependencies(symbol)
-        
-        # Format dependencies
-        formatted_deps = []
-        for dep in dependencies:
-            formatted_dep = {
-                "name": dep.name,
-                "type": dep.type,
-                "file": dep.file.path
-            }
-            formatted_deps.append(formatted_dep)
+        dependencies = self.get_memo(codebase_path, "dependencies")
+        if symbol_name not in dependencies:
+            codebase = self.get_or_create_codebase(codebase_path)
+            
+            # Get the symbol
+            symbol = codebase.get_symbol(symbol_name)
+            
+            # Get and format dependencies, once per codebase edit
+            dependencies[symbol_name] = [
+                {"name": dep.name, "type": dep.type, "file": dep.file.path}
+                for dep in get_dependencies(symbol)
+            ]
+        formatted_deps = dependencies[symbol_name]
         
         return {
             "symbol": symbol_name,
@@ -801,8 +477,8 @@ class CodegenSDKService:
         for imp in imports:
             formatted_import = {
                 "source": imp.source,
-                "symbols": imp.symbols if hasattr(imp, "symbols") else [],
-                "is_default": imp.is_default if hasattr(imp, "is_default") else False
+                "symbols": getattr(imp, "symbols", []),
+                "is_default": getattr(imp, "is_default", False)
             }
             formatted_imports.append(formatted_import)
         
@@ -824,6 +500,7 @@ class CodegenSDKService:
             Result of the operation
         """
         codebase = self.get_or_create_codebase(codebase_path)
+        self.invalidate_index(codebase_path)
         
         # Get the file
         file = codebase.get_file(file_path)
@@ -856,7 +533,7 @@ class CodegenSDKService:
         component = codebase.get_symbol(component_name)
         
         # Check if it's a React component
-        if not hasattr(component, "is_react_component") or not component.is_react_component:
+        if not getattr(component, "is_react_component", False):
             return {
                 "success": False,
                 "message": f"{component_name} is not a React component",
@@ -864,29 +541,29 @@ class CodegenSDKService:
             }
         
         # Get props
-        props = component.props if hasattr(component, "props") else []
+        props = getattr(component, "props", [])
         
         # Format props
         formatted_props = []
         for prop in props:
             formatted_prop = {
                 "name": prop.name,
-                "type": prop.type if hasattr(prop, "type") else "any",
-                "required": prop.required if hasattr(prop, "required") else False,
-                "default_value": prop.default_value if hasattr(prop, "default_value") else None
+                "type": getattr(prop, "type", "any"),
+                "required": getattr(prop, "required", False),
+                "default_value": getattr(prop, "default_value", None)
             }
             formatted_props.append(formatted_prop)
         
         # Get state
-        state = component.state if hasattr(component, "state") else []
+        state = getattr(component, "state", [])
         
         # Format state
         formatted_state = []
         for s in state:
             formatted_s = {
                 "name": s.name,
-                "type": s.type if hasattr(s, "type") else "any",
-                "initial_value": s.initial_value if hasattr(s, "initial_value") else None
+                "type": getattr(s, "type", "any"),
+                "initial_value": getattr(s, "initial_value", None)
             }
             formatted_state.append(formatted_s)
         
@@ -896,7 +573,7 @@ class CodegenSDKService:
             "file": component.file.path,
             "props": formatted_props,
             "state": formatted_state,
-            "is_functional": component.is_functional if hasattr(component, "is_functional") else True
+            "is_functional": getattr(component, "is_functional", True)
         }
     
     def get_call_graph(self, codebase_path: str, function_name: str) -> Dict[str, Any]:
@@ -915,28 +592,28 @@ class CodegenSDKService:
         function = codebase.get_symbol(function_name)
         
         # Get called functions
-        called_functions = function.calls if hasattr(function, "calls") else []
+        called_functions = getattr(function, "calls", [])
         
         # Format called functions
         formatted_calls = []
         for call in called_functions:
             formatted_call = {
                 "name": call.name,
-                "file": call.file.path if hasattr(call, "file") else None,
-                "line": call.line if hasattr(call, "line") else None
+                "file": getattr(getattr(call, "file", None), "path", None),
+                "line": getattr(call, "line", None)
             }
             formatted_calls.append(formatted_call)
         
         # Get functions that call this function
-        callers = function.callers if hasattr(function, "callers") else []
+        callers = getattr(function, "callers", [])
         
         # Format callers
         formatted_callers = []
         for caller in callers:
             formatted_caller = {
                 "name": caller.name,
-                "file": caller.file.path if hasattr(caller, "file") else None,
-                "line": caller.line if hasattr(caller, "line") else None
+                "file": getattr(getattr(caller, "file", None), "path", None),
+                "line": getattr(caller, "line", None)
             }
             formatted_callers.append(formatted_caller)
         
@@ -1008,6 +685,24 @@ class CodegenSDKService:
             "results": formatted_results
         }
     
+    def iter_files(self, codebase_path: str) -> Iterator[Dict[str, Any]]:
+        """Yield the files in the codebase one at a time.
+        
+        Args:
+            codebase_path: Path to the codebase
+            
+        Yields:
+            File info
+        """
+        file_list = self.get_index(codebase_path, "files")
+        sizes = stat_pool.map(file_size, [file.path for file in file_list])
+        for file, size in zip(file_list, sizes):
+            yield {
+                "path": file.path,
+                "size": size,
+                "language": getattr(getattr(file, "language", None), "name", None)
+            }
+    
     def get_all_files(self, codebase_path: str) -> Dict[str, Any]:
         """Get all files in the codebase.
         
@@ -1017,71 +712,73 @@ class CodegenSDKService:
         Returns:
             List of files
         """
-        codebase = self.get_or_create_codebase(codebase_path)
-        
-        # Get all files
-        files = []
-        for file in codebase.files:
-            file_info = {
-                "path": file.path,
-                "size": os.path.getsize(file.path) if os.path.exists(file.path) else 0,
-                "language": file.language.name if hasattr(file, "language") else None
-            }
-            files.append(file_info)
+        files = list(self.iter_files(codebase_path))
         
         return {
             "files": files,
             "count": len(files)
         }
     
-    def get_all_functions(self, codebase_path: str) -> Dict[str, Any]:
-        """Get all functions in the codebase.
+    def iter_functions(self, codebase_path: str) -> Iterator[Dict[str, Any]]:
+        """Yield the functions in the codebase one at a time.
         
         Args:
             codebase_path: Path to the codebase
             
-        Returns:
-            List of functions
+        Yields:
+            Function info
         """
-        codebase = self.get_or_create_codebase(codebase_path)
-        
-        # Get all functions
-        functions = []
-        for function in codebase.functions:
-            function_info = {
+        for function in self.get_index(codebase_path, "functions"):
+            yield {
                 "name": function.name,
                 "file": function.file.path,
                 "line": function.start_line,
-                "parameters": [param.name for param in function.parameters] if hasattr(function, "parameters") else []
+                "parameters": [param.name for param in getattr(function, "parameters", ())]
             }
-            functions.append(function_info)
+    
+    def get_all_functions(self, codebase_path: str) -> Dict[str, Any]:
+        """Get all functions in the codebase.
+        
+        Args:
+            codebase_path: Path to the codebase
+            
+        Returns:
+            List of functions
+        """
+        functions = list(self.iter_functions(codebase_path))
         
         return {
             "functions": functions,
             "count": len(functions)
         }
     
-    def get_all_classes(self, codebase_path: str) -> Dict[str, Any]:
-        """Get all classes in the codebase.
+    def iter_classes(self, codebase_path: str) -> Iterator[Dict[str, Any]]:
+        """Yield the classes in the codebase one at a time.
         
         Args:
             codebase_path: Path to the codebase
             
-        Returns:
-            List of classes
+        Yields:
+            Class info
         """
-        codebase = self.get_or_create_codebase(codebase_path)
-        
-        # Get all classes
-        classes = []
-        for cls in codebase.classes:
-            class_info = {
+        for cls in self.get_index(codebase_path, "classes"):
+            yield {
                 "name": cls.name,
                 "file": cls.file.path,
                 "line": cls.start_line,
-                "methods": [method.name for method in cls.methods] if hasattr(cls, "methods") else []
+                "methods": [method.name for method in getattr(cls, "methods", ())]
             }
-            classes.append(class_info)
+    
+    def get_all_classes(self, codebase_path: str) -> Dict[str, Any]:
+        """Get all classes in the codebase.
+        
+        Args:
+            codebase_path: Path to the codebase
+            
+        Returns:
+            List of classes
+        """
+        classes = list(self.iter_classes(codebase_path))
         
         return {
             "classes": classes,
@@ -1109,7 +806,7 @@ class CodegenSDKService:
         return {
             "file": file_path,
             "content": content,
-            "language": file.language.name if hasattr(file, "language") else None
+            "language": getattr(getattr(file, "language", None), "name", None)
         }
     
     def extract_function(self, codebase_path: str, file_path: str, edit_description: str) -> Dict[str, Any]:
@@ -1124,6 +821,7 @@ class CodegenSDKService:
             Result of the operation
         """
         codebase = self.get_or_create_codebase(codebase_path)
+        self.invalidate_index(codebase_path)
         
         # Get the file
         file = codebase.get_file(file_path)
@@ -1139,18 +837,26 @@ class CodegenSDKService:
             "edit_description": edit_description
         }
     
-    def refactor_code(self, codebase_path: str, file_path: str, edit_description: str) -> Dict[str, Any]:
+    def refactor_code(
+        self, codebase_path: str, file_path: str, edit_description: str, dry_run: bool = False
+    ) -> Dict[str, Any]:
         """Refactor code in a file.
         
         Args:
             codebase_path: Path to the codebase
             file_path: Path to the file
             edit_description: Description of the refactoring
+            dry_run: Return the diff of the refactoring and discard it
+                instead of keeping it
             
         Returns:
             Result of the operation
         """
+        if dry_run:
+            return self.preview_refactor(codebase_path, file_path, edit_description)
+        
         codebase = self.get_or_create_codebase(codebase_path)
+        self.invalidate_index(codebase_path)
         
         # Get the file
         file = codebase.get_file(file_path)
@@ -1163,7 +869,63 @@ class CodegenSDKService:
             "message": result.message,
             "operation": "refactor_code",
             "file_path": file_path,
-            "edit_description": edit_description
+            "edit_description": edit_description,
+            "dry_run": False
+        }
+    
+    def preview_refactor(self, codebase_path: str, file_path: str, edit_description: str) -> Dict[str, Any]:
+        """Run a refactoring on a scratch copy of a codebase and diff the file.
+        
+        The shared Codebase is only read. The SDK applies edits only on
+        commit, so the preview needs a checkout of its own: the source tree
+        is copied without VCS, dependency and build directories, and every
+        parsed file is written from its current, possibly unsaved, in-memory
+        source so the refactoring sees what the user sees.
+        
+        Args:
+            codebase_path: Path to the codebase
+            file_path: Path to the file, relative to the codebase root
+            edit_description: Description of the refactoring
+            
+        Returns:
+            Result of the operation, with the file's unified diff
+        """
+        source = normalize_path(codebase_path)
+        before = self.get_or_create_codebase(codebase_path).get_file(file_path).content
+        
+        with tempfile.TemporaryDirectory(prefix="codehub-preview-") as scratch:
+            root = os.path.join(scratch, "codebase")
+            shutil.copytree(source, root, symlinks=True, ignore=PREVIEW_IGNORE)
+            for file in self.get_index(codebase_path, "files"):
+                relative = os.path.relpath(os.path.join(source, file.path), source)
+                if relative.startswith(os.pardir + os.sep):
+                    continue
+                target = os.path.join(root, relative)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, "w") as f:
+                    f.write(file.content)
+            
+            scratch_codebase = Codebase(root)
+            scratch_file = scratch_codebase.get_file(file_path)
+            result = refactor_code(scratch_file, edit_description)
+            scratch_codebase.commit()
+            after = scratch_codebase.get_file(file_path).content
+        
+        diff = "".join(difflib.unified_diff(
+            before.splitlines(keepends=True),
+            after.splitlines(keepends=True),
+            fromfile=f"a/{file_path}",
+            tofile=f"b/{file_path}",
+        ))
+        
+        return {
+            "success": result.success,
+            "message": result.message,
+            "operation": "refactor_code",
+            "file_path": file_path,
+            "edit_description": edit_description,
+            "dry_run": True,
+            "diff": diff
         }
     
     def generate_documentation(self, codebase_path: str, symbol_name: str) -> Dict[str, Any]:
@@ -1203,6 +965,7 @@ class CodegenSDKService:
             Result of the operation
         """
         codebase = self.get_or_create_codebase(codebase_path)
+        self.invalidate_index(codebase_path)
         
         # Get the function
         function = codebase.get_symbol(function_name)
@@ -1231,6 +994,7 @@ class CodegenSDKService:
             Result of the operation
         """
         codebase = self.get_or_create_codebase(codebase_path)
+        self.invalidate_index(codebase_path)
         
         # Get the function
         function = codebase.get_symbol(function_name)
@@ -1258,6 +1022,7 @@ class CodegenSDKService:
             Result of the operation
         """
         codebase = self.get_or_create_codebase(codebase_path)
+        self.invalidate_index(codebase_path)
         
         # Get the function
         function = codebase.get_symbol(function_name)
@@ -1293,7 +1058,7 @@ class CodegenSDKService:
             formatted_result = {
                 "file": unused_import.file.path,
                 "import": unused_import.source,
-                "symbols": unused_import.symbols if hasattr(unused_import, "symbols") else []
+                "symbols": getattr(unused_import, "symbols", [])
             }
             formatted_results.append(formatted_result)
         
@@ -1312,6 +1077,7 @@ class CodegenSDKService:
             Result of the operation
         """
         codebase = self.get_or_create_codebase(codebase_path)
+        self.invalidate_index(codebase_path)
         
         # Remove unused imports
         result = remove_unused_imports(codebase)
@@ -1335,6 +1101,7 @@ class CodegenSDKService:
             Result of the operation
         """
         codebase = self.get_or_create_codebase(codebase_path)
+        self.invalidate_index(codebase_path)
         
         # Get the file
         file = codebase.get_file(file_path)
@@ -1348,14 +1115,3 @@ class CodegenSDKService:
             "operation": "format_code",
             "file_path": file_path
         }
-
-
-
-@app.function(image=image)
-@modal.asgi_app()
-def fastapi_modal_app():
-    return fastapi_app
-
-
-if __name__ == "__main__":
-    app.deploy("analytics-app")
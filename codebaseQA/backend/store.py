@@ -0,0 +1,207 @@
+"""
+SQLite storage for saved repositories and categories.
+
+Every API worker process opens the same database file, so all workers see
+the same saved repositories. WAL mode lets readers run alongside a writer.
+Queries run in worker threads to keep them off the event loop.
+"""
+
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional
+
+import orjson
+
+DB_PATH = os.environ.get("CODEHUB_DB_PATH", os.path.join(tempfile.gettempdir(), "codehub.db"))
+
+SCHEMA = """
+-- id is not the rowid, so rowids follow the order repos were saved in
+CREATE TABLE IF NOT EXISTS repos (
+    id INTEGER NOT NULL UNIQUE,
+    full_name TEXT NOT NULL,
+    owner TEXT,
+    language TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS repos_owner ON repos (owner);
+CREATE INDEX IF NOT EXISTS repos_language ON repos (language);
+
+CREATE TABLE IF NOT EXISTS repo_categories (
+    repo_id INTEGER NOT NULL REFERENCES repos (id) ON DELETE CASCADE,
+    category TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (repo_id, category)
+);
+CREATE INDEX IF NOT EXISTS repo_categories_category ON repo_categories (category);
+
+CREATE TABLE IF NOT EXISTS categories (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    color TEXT
+);
+"""
+
+_local = threading.local()
+
+
+def _connect() -> sqlite3.Connection:
+    """Get this thread's connection, creating the schema on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+def _set_categories(conn: sqlite3.Connection, repo_id: int, categories: List[str]):
+    conn.execute("DELETE FROM repo_categories WHERE repo_id = ?", (repo_id,))
+    conn.executemany(
+        "INSERT OR IGNORE INTO repo_categories (repo_id, category, position) VALUES (?, ?, ?)",
+        [(repo_id, category, position) for position, category in enumerate(categories)],
+    )
+
+
+def _save_repo(repo: Dict[str, Any], categories: List[str]) -> bool:
+    conn = _connect()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        exists = conn.execute("SELECT 1 FROM repos WHERE id = ?", (repo["id"],)).fetchone()
+        if exists:
+            if categories:
+                _set_categories(conn, repo["id"], categories)
+            return False
+        conn.execute(
+            "INSERT INTO repos (id, full_name, owner, language, data) VALUES (?, ?, ?, ?, ?)",
+            (
+                repo["id"],
+                repo["full_name"],
+                repo["owner"].get("login"),
+                repo.get("language"),
+                orjson.dumps(repo),
+            ),
+        )
+        _set_categories(conn, repo["id"], categories)
+        return True
+
+
+def _list_repos(
+    category: Optional[str], language: Optional[str], limit: Optional[int], offset: int
+) -> List[Dict[str, Any]]:
+    conn = _connect()
+    query = "SELECT repos.id, repos.data FROM repos"
+    clauses, params = [], []
+    if category:
+        query += " JOIN repo_categories ON repo_categories.repo_id = repos.id"
+        clauses.append("repo_categories.category = ?")
+        params.append(category)
+    if language:
+        clauses.append("repos.language = ?")
+        params.append(language)
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY repos.rowid LIMIT ? OFFSET ?"
+    params += [-1 if limit is None else limit, offset]
+
+    repos = {row["id"]: orjson.loads(row["data"]) for row in conn.execute(query, params)}
+    for repo in repos.values():
+        repo["categories"] = []
+    if repos:
+        placeholders = ",".join("?" * len(repos))
+        for row in conn.execute(
+            f"SELECT repo_id, category FROM repo_categories WHERE repo_id IN ({placeholders}) ORDER BY position",
+            list(repos),
+        ):
+            repos[row["repo_id"]]["categories"].append(row["category"])
+    return list(repos.values())
+
+
+def _delete_repo(repo_id: int) -> Optional[Dict[str, Any]]:
+    conn = _connect()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT data FROM repos WHERE id = ?", (repo_id,)).fetchone()
+        if row is None:
+            return None
+        repo = orjson.loads(row["data"])
+        repo["categories"] = [
+            r["category"]
+            for r in conn.execute(
+                "SELECT category FROM repo_categories WHERE repo_id = ? ORDER BY position", (repo_id,)
+            )
+        ]
+        conn.execute("DELETE FROM repos WHERE id = ?", (repo_id,))
+        return repo
+
+
+def _create_category(category: Dict[str, Any]) -> bool:
+    conn = _connect()
+    with conn:
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO categories (id, name, color) VALUES (?, ?, ?)",
+            (category["id"], category["name"], category.get("color")),
+        )
+        return cursor.rowcount == 1
+
+
+def _list_categories() -> List[Dict[str, Any]]:
+    return [dict(row) for row in _connect().execute("SELECT id, name, color FROM categories ORDER BY rowid")]
+
+
+def _delete_category(category_id: str) -> Optional[Dict[str, Any]]:
+    conn = _connect()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT id, name, color FROM categories WHERE id = ?", (category_id,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("DELETE FROM categories WHERE id = ?", (category_id,))
+        conn.execute("DELETE FROM repo_categories WHERE category = ?", (category_id,))
+        return dict(row)
+
+
+async def save_repo(repo: Dict[str, Any], categories: List[str]) -> bool:
+    """
+    Save a repository. Returns False if it was already saved, in which case
+    only its categories are replaced, and only if any are given.
+    """
+    return await asyncio.to_thread(_save_repo, repo, categories)
+
+
+async def list_repos(
+    category: Optional[str] = None,
+    language: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: int = 0,
+) -> List[Dict[str, Any]]:
+    """List saved repositories in the order they were saved, optionally filtered."""
+    return await asyncio.to_thread(_list_repos, category, language, limit, offset)
+
+
+async def delete_repo(repo_id: int) -> Optional[Dict[str, Any]]:
+    """Delete a saved repository, returning it, or None if it was not saved."""
+    return await asyncio.to_thread(_delete_repo, repo_id)
+
+
+async def create_category(category: Dict[str, Any]) -> bool:
+    """Create a category. Returns False if one with the same id exists."""
+    return await asyncio.to_thread(_create_category, category)
+
+
+async def list_categories() -> List[Dict[str, Any]]:
+    """List categories in the order they were created."""
+    return await asyncio.to_thread(_list_categories)
+
+
+async def delete_category(category_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Delete a category and remove it from every repository, returning it, or
+    None if it does not exist.
+    """
+    return await asyncio.to_thread(_delete_category, category_id)
@@ -0,0 +1,173 @@
+import asyncio
+
+import pytest
+
+api = pytest.importorskip("api")
+
+
+def test_singleflight_shares_one_call():
+    calls = []
+
+    async def func():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    async def main():
+        return await asyncio.gather(*(api.singleflight(("test",), func) for _ in range(5)))
+
+    assert asyncio.run(main()) == [1] * 5
+    assert calls == [1]
+    assert api._inflight == {}
+
+
+def test_singleflight_runs_again_after_completion():
+    calls = []
+
+    async def func():
+        calls.append(1)
+        return len(calls)
+
+    async def main():
+        return [await api.singleflight(("test",), func) for _ in range(2)]
+
+    assert asyncio.run(main()) == [1, 2]
+
+
+def test_singleflight_cancelled_caller_does_not_cancel_others():
+    async def func():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        first = asyncio.create_task(api.singleflight(("test",), func))
+        second = asyncio.create_task(api.singleflight(("test",), func))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "done"
+
+
+def test_singleflight_shares_failures_and_forgets_them():
+    calls = []
+
+    async def func():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(
+            *(api.singleflight(("test",), func) for _ in range(3)), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert calls == [1]
+    assert api._inflight == {}
+
+
+class Chunk:
+    def __init__(self, content):
+        self.content = content
+
+
+def token(content):
+    return {"event": "on_chat_model_stream", "data": {"chunk": Chunk(content)}}
+
+
+def tool_start(name):
+    return {"event": "on_tool_start", "data": {"name": name}}
+
+
+async def fake_events(events, delays=None):
+    """Yield agent events, sleeping before each one for as long as asked."""
+    for i, event in enumerate(events):
+        if delays:
+            await asyncio.sleep(delays[i])
+        yield event
+
+
+def coalesce(events):
+    async def main():
+        return [pair async for pair in api.coalesce_agent_events(events)]
+
+    return asyncio.run(main())
+
+
+def test_coalesce_merges_tokens():
+    assert coalesce(fake_events([token("a"), token("b"), token("c")])) == [("content", "abc")]
+
+
+def test_coalesce_flushes_tokens_before_tool_events():
+    events = fake_events([token("a"), tool_start("search"), token("b")])
+
+    assert coalesce(events) == [
+        ("content", "a"),
+        ("on_tool_start", {"name": "search"}),
+        ("content", "b"),
+    ]
+
+
+def test_coalesce_drops_other_events():
+    events = fake_events([token("a"), {"event": "on_chain_start", "data": {}}, token("")])
+
+    assert coalesce(events) == [("content", "a")]
+
+
+def test_coalesce_flushes_at_size(monkeypatch):
+    monkeypatch.setattr(api, "TOKEN_FLUSH_SIZE", 2)
+
+    assert coalesce(fake_events([token("ab"), token("c"), token("d")])) == [
+        ("content", "ab"),
+        ("content", "cd"),
+    ]
+
+
+def test_coalesce_flushes_at_interval(monkeypatch):
+    monkeypatch.setattr(api, "TOKEN_FLUSH_INTERVAL", 0.01)
+
+    events = fake_events([token("a"), token("b")], delays=[0, 0.1])
+    assert coalesce(events) == [("content", "a"), ("content", "b")]
+
+
+def test_coalesce_closes_the_events_when_closed():
+    closed = []
+
+    async def events():
+        try:
+            yield tool_start("search")
+            yield tool_start("never reached")
+        finally:
+            closed.append(True)
+
+    async def main():
+        coalesced = api.coalesce_agent_events(events())
+        assert await coalesced.__anext__() == ("on_tool_start", {"name": "search"})
+        await coalesced.aclose()
+
+    asyncio.run(main())
+    assert closed == [True]
+
+
+def test_coalesce_cancels_a_pending_event_when_closed(monkeypatch):
+    monkeypatch.setattr(api, "TOKEN_FLUSH_INTERVAL", 0.01)
+    closed = []
+
+    async def events():
+        try:
+            yield token("a")
+            await asyncio.Event().wait()
+        finally:
+            closed.append(True)
+
+    async def main():
+        coalesced = api.coalesce_agent_events(events())
+        assert await coalesced.__anext__() == ("content", "a")
+        await coalesced.aclose()
+
+    asyncio.run(main())
+    assert closed == [True]
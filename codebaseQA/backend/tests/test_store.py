@@ -0,0 +1,113 @@
+import asyncio
+import threading
+
+import pytest
+
+import store
+
+
+@pytest.fixture(autouse=True)
+def db(tmp_path, monkeypatch):
+    """Point the store at a fresh database, with fresh per-thread connections."""
+    path = str(tmp_path / "codehub.db")
+    monkeypatch.setenv("CODEHUB_DB_PATH", path)
+    monkeypatch.setattr(store, "DB_PATH", path)
+    monkeypatch.setattr(store, "_local", threading.local())
+    return path
+
+
+def repo(repo_id, language="Python"):
+    return {
+        "id": repo_id,
+        "name": f"repo{repo_id}",
+        "full_name": f"owner/repo{repo_id}",
+        "owner": {"login": "owner"},
+        "language": language,
+    }
+
+
+def names(repos):
+    return [r["full_name"] for r in repos]
+
+
+def test_save_repo_inserts_once():
+    assert asyncio.run(store.save_repo(repo(1), ["a"]))
+    assert not asyncio.run(store.save_repo(repo(1), ["b"]))
+
+    repos = asyncio.run(store.list_repos())
+    assert names(repos) == ["owner/repo1"]
+    assert repos[0]["categories"] == ["b"]
+
+
+def test_saving_again_without_categories_keeps_them():
+    asyncio.run(store.save_repo(repo(1), ["a", "b"]))
+    asyncio.run(store.save_repo(repo(1), []))
+
+    assert asyncio.run(store.list_repos())[0]["categories"] == ["a", "b"]
+
+
+def test_categories_keep_their_order():
+    asyncio.run(store.save_repo(repo(1), ["c", "a", "b"]))
+
+    assert asyncio.run(store.list_repos())[0]["categories"] == ["c", "a", "b"]
+
+
+def test_concurrent_saves_insert_once():
+    async def save_many():
+        return await asyncio.gather(*(store.save_repo(repo(1), ["a"]) for _ in range(8)))
+
+    assert sum(asyncio.run(save_many())) == 1
+    assert names(asyncio.run(store.list_repos())) == ["owner/repo1"]
+
+
+def test_list_repos_filters():
+    asyncio.run(store.save_repo(repo(1, "Python"), ["a"]))
+    asyncio.run(store.save_repo(repo(2, "Go"), ["a", "b"]))
+    asyncio.run(store.save_repo(repo(3, "Python"), ["b"]))
+
+    assert names(asyncio.run(store.list_repos(category="b"))) == ["owner/repo2", "owner/repo3"]
+    assert names(asyncio.run(store.list_repos(language="Python"))) == ["owner/repo1", "owner/repo3"]
+    assert names(asyncio.run(store.list_repos(category="a", language="Go"))) == ["owner/repo2"]
+
+
+def test_list_repos_pages_in_save_order():
+    for repo_id in (3, 1, 2):
+        asyncio.run(store.save_repo(repo(repo_id), []))
+
+    assert names(asyncio.run(store.list_repos())) == ["owner/repo3", "owner/repo1", "owner/repo2"]
+    assert names(asyncio.run(store.list_repos(limit=1, offset=1))) == ["owner/repo1"]
+    # An offset without a limit returns the rest
+    assert names(asyncio.run(store.list_repos(offset=1))) == ["owner/repo1", "owner/repo2"]
+
+
+def test_delete_repo_removes_its_categories():
+    asyncio.run(store.save_repo(repo(1), ["a", "b"]))
+
+    deleted = asyncio.run(store.delete_repo(1))
+    assert deleted["full_name"] == "owner/repo1"
+    assert deleted["categories"] == ["a", "b"]
+    assert asyncio.run(store.list_repos()) == []
+    count = store._connect().execute("SELECT COUNT(*) FROM repo_categories").fetchone()[0]
+    assert count == 0
+
+
+def test_delete_missing_repo():
+    assert asyncio.run(store.delete_repo(1)) is None
+
+
+def test_create_category_once():
+    category = {"id": "a", "name": "A", "color": "#fff"}
+    assert asyncio.run(store.create_category(category))
+    assert not asyncio.run(store.create_category(dict(category, name="Other")))
+
+    assert asyncio.run(store.list_categories()) == [category]
+
+
+def test_delete_category_removes_it_from_repos():
+    asyncio.run(store.create_category({"id": "a", "name": "A"}))
+    asyncio.run(store.save_repo(repo(1), ["a", "b"]))
+
+    assert asyncio.run(store.delete_category("a")) == {"id": "a", "name": "A", "color": None}
+    assert asyncio.run(store.delete_category("a")) is None
+    assert asyncio.run(store.list_categories()) == []
+    assert asyncio.run(store.list_repos())[0]["categories"] == ["b"]
@@ -140,6 +140,9 @@ export async function POST(req: NextRequest) {
     if (params.parameterName) backendParams.parameter_name = params.parameterName
     if (params.parameterType) backendParams.parameter_type = params.parameterType
     if (params.returnType) backendParams.return_type = params.returnType
+    if (params.limit !== undefined) backendParams.limit = params.limit
+    if (params.offset !== undefined) backendParams.offset = params.offset
+    if (params.includeSource !== undefined) backendParams.include_source = params.includeSource
 
     // Make the request to the backend
     const response = await fetch(`${backendUrl}${endpoint}`, {
@@ -49,10 +49,13 @@ export class CodegenSDKService {
   }
 
   /**
-   * Find dead code in a codebase.
+   * Find dead code in a codebase, one page at a time. The response holds
+   * the page in `dead_code` and the number of dead functions in `total_count`.
    */
-  async findDeadCode(): Promise<any> {
-    return this.callApi('findDeadCode');
+  async findDeadCode(
+    options: { limit?: number; offset?: number; includeSource?: boolean } = {}
+  ): Promise<any> {
+    return this.callApi('findDeadCode', options);
   }
 
   /**